@@ -1,10 +1,531 @@
 import numpy as np
-from datetime import datetime
-from dateutil import parser
-from models import items, containers, current_date
+import bisect
+import math
+import time
+import multiprocessing
+from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from models import items, containers, clock, Container, to_box, box_volume, box_coordinates
+from concurrency import read_locked, write_locked
+from occupancy import find_occupancy_fit
+from heightmap import find_heightmap_fit
+from placement_cache import placement_cache
+from instrumentation import timed, count
+import config
 
-def find_optimal_placement(item, available_containers):
-    """Find the optimal placement for an item using 3D bin packing algorithm"""
+def get_orientations(item):
+    """Get the six axis-aligned orientations of an item as (width, depth, height)"""
+    return [
+        (item.width, item.depth, item.height),
+        (item.width, item.height, item.depth),
+        (item.depth, item.width, item.height),
+        (item.depth, item.height, item.width),
+        (item.height, item.width, item.depth),
+        (item.height, item.depth, item.width)
+    ]
+
+def placement_score(item, container, y):
+    """Score a placement by priority, zone preference and depth"""
+    score = item.priority
+    
+    # Bonus for preferred zone
+    if container.zone == item.preferred_zone:
+        score += 50
+    
+    # Bonus for accessibility (closer to open face)
+    score -= y * 0.5  # Less depth means more accessible
+    
+    return score
+
+def record_candidates(stats, evaluated):
+    """Add the candidate positions a fit search evaluated to stats and the metrics"""
+    if stats is not None:
+        stats["candidatesEvaluated"] = stats.get("candidatesEvaluated", 0) + evaluated
+    count("csms_candidates_evaluated_total", evaluated)
+
+@timed
+def find_extreme_point(container, width, depth, height, stats=None, depth_limit=None, min_depth=0):
+    """Find the shallowest free position for a box using extreme points.
+
+    Candidate coordinates on each axis are the container origin plus the far
+    faces of the items already placed. Any free position can be slid towards
+    the origin until it rests on such a face, so scanning depth values in
+    ascending order and stopping at the first feasible one gives the same
+    answer as a unit-step scan over the whole container. Only positions
+    from min_depth up to (but not including) depth_limit are considered.
+    """
+    max_x = container.width - width
+    max_y = container.depth - depth
+    max_z = container.height - height
+    if max_x < 0 or max_y < 0 or max_z < 0:
+        return None
+    
+    if depth_limit is not None:
+        max_y = min(max_y, math.ceil(depth_limit) - 1)
+        if max_y < 0:
+            return None
+    
+    ys = sorted(
+        y for y in {0} | {box[4] for box in container.boxes.values()}
+        if min_depth <= y <= max_y
+    )
+    
+    evaluated = 0
+    for y in ys:
+        # Only items overlapping this depth slab can block or support the box
+        slab = [
+            (box[0], box[3], box[2], box[5])
+            for _, box in container.get_boxes_overlapping((0, y, 0, container.width, y + depth, container.height))
+        ]
+        xs = sorted({0} | {x1 for x0, x1, z0, z1 in slab if x1 <= max_x})
+        
+        # Sweep from the floor up so each column finds its lowest gap in one pass
+        slab.sort(key=lambda box: box[2])
+        
+        for x in xs:
+            evaluated += 1
+            
+            z = 0
+            for x0, x1, z0, z1 in slab:
+                if x0 >= x + width or x1 <= x:
+                    continue
+                if z0 >= z + height:
+                    break
+                if z1 > z:
+                    z = z1
+                    if z > max_z:
+                        break
+            
+            if z <= max_z:
+                record_candidates(stats, evaluated)
+                return x, y, z
+    
+    record_candidates(stats, evaluated)
+    return None
+
+class PackingState:
+    """Container state shared by every item of a batch placement.
+
+    Containers only gain items while a batch is packed, so once a box is known
+    not to fit shallower than some depth it never will, and neither will any
+    box at least as large on every axis. Those depth floors let later items
+    skip the front of containers that have already filled up.
+    """
+    
+    def __init__(self, available_containers, backend=None):
+        self.used_volume = {}
+        self.depth_floors = {}
+        # New items can give support where there was none, so with gravity a
+        # box that did not fit may fit later and depth floors do not hold
+        self.track_depth = (backend or config.PLACEMENT_BACKEND) != "heightmap"
+        for container in available_containers:
+            self.used_volume[container.container_id] = sum(map(box_volume, container.boxes.values()))
+            self.depth_floors[container.container_id] = {}  # (width, depth, height) -> depth
+    
+    def free_volume(self, container):
+        return container.width * container.depth * container.height - self.used_volume[container.container_id]
+    
+    def depth_floor(self, container, width, depth, height):
+        """Get the depth above which a box is known not to fit (inf if it never fits)"""
+        floor = 0
+        for (floor_width, floor_depth, floor_height), known in self.depth_floors[container.container_id].items():
+            if known > floor and width >= floor_width and depth >= floor_depth and height >= floor_height:
+                floor = known
+        return floor
+    
+    def record_depth_floor(self, container, width, depth, height, floor):
+        if not self.track_depth:
+            return
+        floors = self.depth_floors[container.container_id]
+        if floors.get((width, depth, height), 0) < floor:
+            floors[(width, depth, height)] = floor
+    
+    def record_search(self, container, width, depth, height, corner, depth_limit):
+        """Record what a fit search for a box revealed about the container"""
+        if corner is not None:
+            floor = corner[1]
+        elif depth_limit is None:
+            floor = float('inf')
+        else:
+            floor = math.ceil(depth_limit)
+        self.record_depth_floor(container, width, depth, height, floor)
+    
+    def record_placement(self, container, position):
+        self.used_volume[container.container_id] += box_volume(
+            to_box(position["startCoordinates"], position["endCoordinates"])
+        )
+
+FIT_FUNCTIONS = {
+    "extreme_point": find_extreme_point,
+    "occupancy": find_occupancy_fit,
+    "heightmap": find_heightmap_fit
+}
+
+def get_fit_function(backend):
+    """Get the fit search for a placement backend name"""
+    return FIT_FUNCTIONS.get(backend, find_extreme_point)
+
+@timed
+def find_optimal_placement(item, available_containers, stats=None, backend=None, state=None, workers=None):
+    """Find the optimal placement for an item using extreme-point 3D bin packing"""
+    backend = backend or config.PLACEMENT_BACKEND
+    workers = config.PLACEMENT_WORKERS if workers is None else workers
+    if workers > 1 and len(available_containers) > 1:
+        return find_optimal_placement_parallel(item, available_containers, workers, stats, backend, state)
+    
+    find_fit = get_fit_function(backend)
+    
+    best_container = None
+    best_position = None
+    best_score = float('-inf')
+    
+    # Sort containers by zone preference first
+    sorted_containers = sorted(
+        available_containers, 
+        key=lambda c: 0 if c.zone == item.preferred_zone else 1
+    )
+    
+    for container in sorted_containers:
+        # Skip if even the shallowest position cannot beat the current best
+        if placement_score(item, container, 0) <= best_score:
+            count("csms_containers_skipped_total", reason="score")
+            continue
+        
+        if state is not None and state.free_volume(container) < item.width * item.depth * item.height:
+            count("csms_containers_skipped_total", reason="volume")
+            continue
+        
+        for width, depth, height in get_orientations(item):
+            min_depth = 0
+            if state is not None:
+                min_depth = state.depth_floor(container, width, depth, height)
+            
+            # Only positions shallow enough to beat the current best matter
+            depth_limit = None
+            if best_score != float('-inf'):
+                depth_limit = 2 * (placement_score(item, container, 0) - best_score)
+            
+            if min_depth == float('inf') or (depth_limit is not None and min_depth >= depth_limit):
+                continue
+            
+            corner = placement_cache.search(
+                find_fit, backend, container, width, depth, height, stats, depth_limit, min_depth
+            )
+            
+            if state is not None:
+                state.record_search(container, width, depth, height, corner, depth_limit)
+            
+            if corner is None:
+                continue
+            
+            x, y, z = corner
+            score = placement_score(item, container, y)
+            if score > best_score:
+                best_score = score
+                best_container = container
+                best_position = {
+                    "startCoordinates": {"width": x, "depth": y, "height": z},
+                    "endCoordinates": {"width": x + width, "depth": y + depth, "height": z + height}
+                }
+    
+    return best_container, best_position
+
+placement_pool = None
+placement_pool_workers = 0
+
+def get_placement_pool(workers):
+    """Get the shared process pool used for parallel placement search.
+
+    Workers are spawned rather than forked: a fork of the multithreaded
+    server could copy a lock another thread holds and hang on it.
+    """
+    global placement_pool, placement_pool_workers
+    if placement_pool is None or placement_pool_workers != workers:
+        if placement_pool is not None:
+            placement_pool.shutdown(wait=False)
+        placement_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_search_worker
+        )
+        placement_pool_workers = workers
+    return placement_pool
+
+def init_search_worker():
+    """Set up a placement search worker, which keeps no metrics of its own"""
+    config.METRICS_ENABLED = False
+
+def container_snapshot(container):
+    """Get a compact picklable copy of a container's geometry and contents"""
+    return (
+        container.container_id,
+        container.version,
+        container.zone,
+        container.width,
+        container.depth,
+        container.height,
+        dict(container.boxes)
+    )
+
+# Worker copies of containers, kept between searches: container_id -> Container
+search_containers = {}
+
+def search_container(snapshot, orientations, backend):
+    """Search every orientation of an item in one container (runs in a worker process)"""
+    container_id, version, zone, width, depth, height, boxes = snapshot
+    container = search_containers.get(container_id)
+    if container is None or (container.width, container.depth, container.height) != (width, depth, height):
+        container = search_containers[container_id] = Container(container_id, zone, width, depth, height)
+        container.version = None
+    # Only the items placed or moved since this worker last saw the container are indexed
+    if container.version != version:
+        container.sync_boxes(boxes, version)
+    find_fit = get_fit_function(backend)
+    
+    stats = {}
+    results = []
+    best_y = None
+    for box_width, box_depth, box_height, min_depth in orientations:
+        # Later orientations only matter if they are shallower than the best so far
+        depth_limit = best_y
+        if depth_limit is not None and min_depth >= depth_limit:
+            results.append((None, depth_limit))
+            continue
+        
+        corner = find_fit(container, box_width, box_depth, box_height, stats, depth_limit, min_depth)
+        if corner is not None and (best_y is None or corner[1] < best_y):
+            best_y = corner[1]
+        results.append((corner, depth_limit))
+    
+    return results, stats
+
+@timed
+def find_optimal_placement_parallel(item, available_containers, workers, stats=None, backend=None, state=None):
+    """Find the optimal placement by searching containers on a process pool.
+
+    Results are reduced in the same container and orientation order as the
+    serial search with the same strict comparison, so both pick the same
+    placement.
+    """
+    backend = backend or config.PLACEMENT_BACKEND
+    pool = get_placement_pool(workers)
+    
+    # Sort containers by zone preference first
+    sorted_containers = sorted(
+        available_containers, 
+        key=lambda c: 0 if c.zone == item.preferred_zone else 1
+    )
+    
+    tasks = []
+    for container in sorted_containers:
+        if state is not None and state.free_volume(container) < item.width * item.depth * item.height:
+            continue
+        
+        orientations = []
+        for width, depth, height in get_orientations(item):
+            min_depth = 0
+            if state is not None:
+                min_depth = state.depth_floor(container, width, depth, height)
+            if min_depth != float('inf'):
+                orientations.append((width, depth, height, min_depth))
+        
+        if orientations:
+            future = pool.submit(search_container, container_snapshot(container), orientations, backend)
+            tasks.append((container, orientations, future))
+    
+    best_container = None
+    best_position = None
+    best_score = float('-inf')
+    
+    for container, orientations, future in tasks:
+        # Searches that cannot beat the current best are dropped if not yet started
+        if placement_score(item, container, 0) <= best_score:
+            future.cancel()
+            continue
+        
+        results, worker_stats = future.result()
+        if stats is not None:
+            for key, value in worker_stats.items():
+                stats[key] = stats.get(key, 0) + value
+        
+        for (width, depth, height, _), (corner, depth_limit) in zip(orientations, results):
+            if state is not None:
+                state.record_search(container, width, depth, height, corner, depth_limit)
+            
+            if corner is None:
+                continue
+            
+            x, y, z = corner
+            score = placement_score(item, container, y)
+            if score > best_score:
+                best_score = score
+                best_container = container
+                best_position = {
+                    "startCoordinates": {"width": x, "depth": y, "height": z},
+                    "endCoordinates": {"width": x + width, "depth": y + depth, "height": z + height}
+                }
+    
+    return best_container, best_position
+
+@timed
+def find_and_place(item, available_containers, retries=3, backend=None):
+    """Find the best placement for an item and commit it, safe against concurrent requests.
+
+    The search runs under read locks, so searches for different items proceed
+    together. The chosen container is then write-locked and the placement is
+    committed only if the container has not changed since it was searched;
+    otherwise the search is repeated, the last time with every container
+    write-locked. Returns (container, position), or (None, None).
+    """
+    for attempt in range(retries + 1):
+        exclusive = attempt == retries
+        with (write_locked if exclusive else read_locked)(available_containers):
+            best_container, best_position = find_optimal_placement(item, available_containers, backend=backend)
+            if not best_container:
+                return None, None
+            version = best_container.version
+            if exclusive:
+                best_container.add_item(
+                    item.item_id,
+                    best_position["startCoordinates"],
+                    best_position["endCoordinates"]
+                )
+                item.set_position(best_container.container_id, best_position)
+                return best_container, best_position
+        
+        with write_locked([best_container]):
+            if best_container.version == version:
+                best_container.add_item(
+                    item.item_id,
+                    best_position["startCoordinates"],
+                    best_position["endCoordinates"]
+                )
+                item.set_position(best_container.container_id, best_position)
+                return best_container, best_position
+
+def parse_time_budget(value):
+    """Get a time budget in seconds from request data, None meaning no limit.
+
+    Raises ValueError if it is not a non-negative number.
+    """
+    if value is None:
+        return None
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        budget = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"timeBudget must be a number of seconds, not {value!r}") from None
+    if not budget >= 0:
+        raise ValueError(f"timeBudget must not be negative, not {value!r}")
+    return budget
+
+def pack_items(manifest, available_containers, time_budget=None, backend=None, workers=None, state=None,
+               stop=None):
+    """Place a whole manifest, yielding each item's result as soon as it is known.
+
+    Items are grouped by preferred zone and packed by descending priority and
+    then descending volume, so the result does not depend on manifest order.
+    Placed items yield {itemId, containerId, position} and the rest yield
+    {itemId, reason}; items left when the time budget (in seconds) runs out,
+    or once the stop event is set, are reported as unplaced.
+    """
+    started = time.perf_counter()
+    if state is None:
+        state = PackingState(available_containers, backend)
+    
+    ordered = sorted(
+        manifest,
+        key=lambda item: (
+            item.preferred_zone or "",
+            -item.priority,
+            -(item.width * item.depth * item.height)
+        )
+    )
+    
+    timed_out = False
+    
+    for item in ordered:
+        if time_budget is not None and time.perf_counter() - started > time_budget:
+            timed_out = True
+        
+        if timed_out:
+            yield {"itemId": item.item_id, "reason": "Time budget exceeded"}
+            continue
+        
+        if stop is not None and stop.is_set():
+            yield {"itemId": item.item_id, "reason": "Cancelled"}
+            continue
+        
+        best_container, best_position = find_optimal_placement(
+            item, available_containers, backend=backend, state=state, workers=workers
+        )
+        
+        if not best_container:
+            yield {"itemId": item.item_id, "reason": "No space available"}
+            continue
+        
+        best_container.add_item(
+            item.item_id,
+            best_position["startCoordinates"],
+            best_position["endCoordinates"]
+        )
+        item.set_position(best_container.container_id, best_position)
+        state.record_placement(best_container, best_position)
+        
+        yield {
+            "itemId": item.item_id,
+            "containerId": best_container.container_id,
+            "position": best_position
+        }
+
+def container_utilization(available_containers, state):
+    """Get the item count and used volume of each container after packing"""
+    utilization = []
+    for container in available_containers:
+        total_volume = container.width * container.depth * container.height
+        used_volume = state.used_volume[container.container_id]
+        utilization.append({
+            "containerId": container.container_id,
+            "itemCount": len(container.boxes),
+            "usedVolume": used_volume,
+            "totalVolume": total_volume,
+            "utilization": used_volume / total_volume if total_volume else 0
+        })
+    return utilization
+
+@timed
+def pack_manifest(manifest, available_containers, time_budget=None, backend=None, workers=None,
+                  on_result=None, stop=None):
+    """Place a whole manifest, sharing container state across the batch.
+
+    on_result, if given, is called with each item's result as it is known.
+    """
+    started = time.perf_counter()
+    state = PackingState(available_containers, backend)
+    
+    placements = []
+    unplaced = []
+    for result in pack_items(manifest, available_containers, time_budget, backend, workers, state, stop):
+        if on_result is not None:
+            on_result(result)
+        if "containerId" in result:
+            placements.append(result)
+        else:
+            unplaced.append(result)
+    
+    return {
+        "placements": placements,
+        "unplaced": unplaced,
+        "utilization": container_utilization(available_containers, state),
+        "timedOut": any(result["reason"] == "Time budget exceeded" for result in unplaced),
+        "cancelled": any(result["reason"] == "Cancelled" for result in unplaced),
+        "elapsedSeconds": time.perf_counter() - started
+    }
+
+def find_optimal_placement_exhaustive(item, available_containers, stats=None):
+    """Find the optimal placement by scanning every unit position (reference implementation)"""
     best_container = None
     best_position = None
     best_score = float('-inf')
@@ -22,17 +543,7 @@ def find_optimal_placement(item, available_containers):
             container.height < item.height):
             continue
         
-        # Try different orientations
-        orientations = [
-            (item.width, item.depth, item.height),
-            (item.width, item.height, item.depth),
-            (item.depth, item.width, item.height),
-            (item.depth, item.height, item.width),
-            (item.height, item.width, item.depth),
-            (item.height, item.depth, item.width)
-        ]
-        
-        for width, depth, height in orientations:
+        for width, depth, height in get_orientations(item):
             # Skip if this orientation doesn't fit
             if (container.width < width or 
                 container.depth < depth or 
@@ -43,20 +554,14 @@ def find_optimal_placement(item, available_containers):
             for x in range(container.width - width + 1):
                 for y in range(container.depth - depth + 1):
                     for z in range(container.height - height + 1):
+                        if stats is not None:
+                            stats["candidatesEvaluated"] = stats.get("candidatesEvaluated", 0) + 1
+                        
                         start_coords = {"width": x, "depth": y, "height": z}
                         end_coords = {"width": x + width, "depth": y + depth, "height": z + height}
                         
                         if container.is_space_available(start_coords, end_coords):
-                            # Calculate score based on priority and zone preference
-                            score = item.priority
-                            
-                            # Bonus for preferred zone
-                            if container.zone == item.preferred_zone:
-                                score += 50
-                            
-                            # Bonus for accessibility (closer to open face)
-                            score -= y * 0.5  # Less depth means more accessible
-                            
+                            score = placement_score(item, container, y)
                             if score > best_score:
                                 best_score = score
                                 best_container = container
@@ -67,13 +572,13 @@ def find_optimal_placement(item, available_containers):
     
     return best_container, best_position
 
-def calculate_retrieval_steps(container, item_id):
+@timed
+def calculate_retrieval_steps(container, item_id, step_number=1):
     """Calculate steps needed to retrieve an item"""
     blocking_items = container.get_items_blocking(item_id)
     
     # Generate retrieval steps
     retrieval_steps = []
-    step_number = 1
     
     for blocking_id in blocking_items:
         # Step to remove blocking item
@@ -115,12 +620,237 @@ def calculate_retrieval_steps(container, item_id):
     
     return retrieval_steps
 
+@timed
+def merge_retrieval_steps(container, item_ids, step_number=1):
+    """Calculate one retrieval sequence for several items in a container.
+
+    Every blocker of any target is removed and set aside once, the targets
+    are retrieved as they are reached from the open face, and the blockers
+    are placed back in reverse order at the end. Targets that block each
+    other are simply retrieved, never set aside.
+    """
+    targets = set(item_ids)
+    to_clear = set(targets)
+    for item_id in item_ids:
+        to_clear.update(container.get_items_blocking(item_id))
+    
+    # Front-to-back order removes every item before anything behind it
+    order = sorted(
+        to_clear,
+        key=lambda id: (container.boxes[id][1], container.placement_order[id])
+    )
+    
+    retrieval_steps = []
+    set_aside = []
+    for item_id in order:
+        if item_id in targets:
+            retrieval_steps.append({
+                "step": step_number,
+                "action": "retrieve",
+                "itemId": item_id,
+                "itemName": items[item_id].name
+            })
+            step_number += 1
+            continue
+        
+        retrieval_steps.append({
+            "step": step_number,
+            "action": "remove",
+            "itemId": item_id,
+            "itemName": items[item_id].name
+        })
+        step_number += 1
+        retrieval_steps.append({
+            "step": step_number,
+            "action": "setAside",
+            "itemId": item_id,
+            "itemName": items[item_id].name
+        })
+        step_number += 1
+        set_aside.append(item_id)
+    
+    for item_id in reversed(set_aside):
+        retrieval_steps.append({
+            "step": step_number,
+            "action": "placeBack",
+            "itemId": item_id,
+            "itemName": items[item_id].name
+        })
+        step_number += 1
+    
+    return retrieval_steps
+
+@timed
+def find_best_fit(item, container, backend=None):
+    """Find the shallowest position for an item in one container, or None"""
+    find_fit = get_fit_function(backend or config.PLACEMENT_BACKEND)
+    best = None
+    for width, depth, height in get_orientations(item):
+        depth_limit = best[0]["depth"] if best else None
+        corner = find_fit(container, width, depth, height, None, depth_limit)
+        if corner is not None:
+            x, y, z = corner
+            best = (
+                {"width": x, "depth": y, "height": z},
+                {"width": x + width, "depth": y + depth, "height": z + height}
+            )
+    if best is None:
+        return None
+    return {"startCoordinates": best[0], "endCoordinates": best[1]}
+
+@timed
+def plan_rearrangement(item, available_containers, node_budget=None, time_budget=None, backend=None):
+    """Find the fewest moves of lower-priority items that make room for an item.
+
+    Move sets are tried from smallest to largest and, within a size, by the
+    number of retrieval steps the moved items need. A move set works when the
+    item fits in the emptied container and every moved item fits in some
+    other container. The search stops at the node or time budget.
+
+    Returns (container, position, moves), where moves are dicts with itemId,
+    fromContainer, toContainer and position in execution order, or
+    (None, None, []) if no move set was found.
+    """
+    node_budget = config.REARRANGEMENT_NODE_BUDGET if node_budget is None else node_budget
+    time_budget = config.REARRANGEMENT_TIME_BUDGET if time_budget is None else time_budget
+    started = time.perf_counter()
+    nodes = 0
+    item_volume = item.width * item.depth * item.height
+    
+    # Sort containers by zone preference first
+    sorted_containers = sorted(
+        available_containers, 
+        key=lambda c: 0 if c.zone == item.preferred_zone else 1
+    )
+    
+    for source in sorted_containers:
+        if source.width * source.depth * source.height < item_volume:
+            continue
+        
+        # Lower-priority items ranked by retrieval cost, then largest first
+        movable = []
+        for other_id in source.boxes:
+            other = items.get(other_id)
+            if other is None or other.priority >= item.priority:
+                continue
+            cost = len(source.get_items_blocking(other_id)) + 1
+            volume = other.width * other.depth * other.height
+            movable.append((cost, -volume, other_id))
+        movable.sort()
+        movable = movable[:config.REARRANGEMENT_CANDIDATES]
+        if not movable:
+            continue
+        
+        used_volume = sum(map(box_volume, source.boxes.values()))
+        free_volume = source.width * source.depth * source.height - used_volume
+        
+        scratch_source = source.copy()
+        scratch_others = [c.copy() for c in sorted_containers if c is not source]
+        
+        for move_count in range(1, min(config.REARRANGEMENT_MAX_MOVES, len(movable)) + 1):
+            move_sets = sorted(
+                combinations(movable, move_count),
+                key=lambda moves: sum(cost for cost, _, _ in moves)
+            )
+            for move_set in move_sets:
+                nodes += 1
+                if nodes > node_budget or time.perf_counter() - started > time_budget:
+                    return None, None, []
+                
+                moved_ids = [other_id for _, _, other_id in move_set]
+                if free_volume - sum(volume for _, volume, _ in move_set) < item_volume:
+                    continue
+                
+                removed = [(other_id, scratch_source.boxes[other_id]) for other_id in moved_ids]
+                for other_id in moved_ids:
+                    scratch_source.remove_item(other_id)
+                
+                position = find_best_fit(item, scratch_source, backend)
+                moves = []
+                if position is not None:
+                    # Relocate the moved items, largest first
+                    for _, _, other_id in sorted(move_set, key=lambda move: move[1]):
+                        destination, destination_position = find_optimal_placement(
+                            items[other_id], scratch_others, backend=backend, workers=0
+                        )
+                        if destination is None:
+                            break
+                        destination.add_item(
+                            other_id,
+                            destination_position["startCoordinates"],
+                            destination_position["endCoordinates"]
+                        )
+                        moves.append({
+                            "itemId": other_id,
+                            "fromContainer": source.container_id,
+                            "toContainer": destination.container_id,
+                            "position": destination_position
+                        })
+                
+                if position is not None and len(moves) == len(move_set):
+                    # Move the items nearest the open face first
+                    depth_of = {other_id: box[1] for other_id, box in removed}
+                    moves.sort(key=lambda move: depth_of[move["itemId"]])
+                    return source, position, moves
+                
+                # Undo the trial on the scratch containers
+                for move in moves:
+                    for scratch in scratch_others:
+                        if scratch.container_id == move["toContainer"]:
+                            scratch.remove_item(move["itemId"])
+                for other_id, box in removed:
+                    scratch_source.add_item(other_id, *box_coordinates(box))
+    
+    return None, None, []
+
+@timed
+def apply_rearrangement(moves, step_number=1):
+    """Carry out planned moves and get their steps in retrieval-step format"""
+    steps = []
+    for move in moves:
+        source = containers[move["fromContainer"]]
+        destination = containers[move["toContainer"]]
+        moved_id = move["itemId"]
+        
+        retrieval_steps = calculate_retrieval_steps(source, moved_id, step_number)
+        steps.extend(retrieval_steps)
+        step_number += len(retrieval_steps)
+        
+        source.remove_item(moved_id)
+        destination.add_item(
+            moved_id,
+            move["position"]["startCoordinates"],
+            move["position"]["endCoordinates"]
+        )
+        items[moved_id].set_position(destination.container_id, move["position"])
+        
+        steps.append({
+            "step": step_number,
+            "action": "place",
+            "itemId": moved_id,
+            "itemName": items[moved_id].name,
+            "fromContainer": source.container_id,
+            "toContainer": destination.container_id,
+            "position": move["position"]
+        })
+        step_number += 1
+    
+    return steps
+
+@timed
 def identify_waste_items():
     """Identify items that are waste (expired or out of uses)"""
     waste_items = []
     
-    for item_id, item in items.items():
-        is_waste, reason = item.is_waste(current_date)
+    now = clock.now()
+    
+    # Only items out of uses or past their expiry date can be waste
+    candidate_ids = set(items.with_no_uses())
+    candidate_ids.update(items.expiring_before(now))
+    
+    for item_id in sorted(candidate_ids, key=items.sequence.get):
+        item = items[item_id]
+        is_waste, reason = item.is_waste(now)
         if is_waste:
             waste_items.append({
                 "itemId": item_id,
@@ -132,14 +862,179 @@ def identify_waste_items():
     
     return waste_items
 
-def create_waste_return_plan(undocking_container_id, max_weight):
-    """Create a plan for returning waste items"""
+@timed
+def solve_return_knapsack(candidates, max_weight, max_volume, objective="mass", time_budget=None):
+    """Choose waste items that maximize returned mass (or volume) within limits.
+
+    candidates are (item_id, weight, volume) tuples. A depth-first branch
+    and bound, seeded with a greedy fill, takes items in descending order of
+    value per unit of the binding limit (the one the candidates overfill
+    most). Each node is bounded by the fractional (LP) fill of that limit's
+    remaining capacity, which prunes whichever limit binds. Returns (item
+    ids, optimal), where optimal is False if the time budget cut the search
+    short.
+    """
+    started = time.perf_counter()
+    value_index = 1 if objective == "mass" else 2
+    capacity = max_weight if objective == "mass" else max_volume
+    
+    usable = [c for c in candidates if c[1] <= max_weight and c[2] <= max_volume]
+    total_weight = sum(c[1] for c in usable)
+    total_volume = sum(c[2] for c in usable)
+    
+    # Everything fits: nothing to optimize
+    if total_weight <= max_weight and total_volume <= max_volume:
+        return [c[0] for c in usable], True
+    
+    # The limit the candidates overfill most binds; the other may be infinite
+    if (total_weight / max_weight if total_weight else 0) >= (total_volume / max_volume if total_volume else 0):
+        cost_index, limit = 1, max_weight
+    else:
+        cost_index, limit = 2, max_volume
+    usable.sort(
+        key=lambda c: (c[value_index] / c[cost_index] if c[cost_index] else float('inf'), c[value_index]),
+        reverse=True
+    )
+    
+    suffix = [0] * (len(usable) + 1)
+    for index in range(len(usable) - 1, -1, -1):
+        suffix[index] = suffix[index + 1] + usable[index][value_index]
+    
+    # Running totals of cost and value in sort order, for the fractional bound
+    cost_prefix = [0]
+    value_prefix = [0]
+    for candidate in usable:
+        cost_prefix.append(cost_prefix[-1] + candidate[cost_index])
+        value_prefix.append(value_prefix[-1] + candidate[value_index])
+    
+    def bound(index, weight, volume):
+        """Upper bound on the value the items from index on can still add"""
+        used = weight if cost_index == 1 else volume
+        # Whole items fit up to end, then a fraction of the next one
+        end = bisect.bisect_right(cost_prefix, cost_prefix[index] + limit - used, index) - 1
+        fractional = value_prefix[end] - value_prefix[index]
+        if end < len(usable):
+            room = limit - used - (cost_prefix[end] - cost_prefix[index])
+            fractional += usable[end][value_index] * room / usable[end][cost_index]
+        own = capacity - (weight if objective == "mass" else volume)
+        return min(suffix[index], fractional, own)
+    
+    target = bound(0, 0, 0)
+    
+    # Greedy seed
+    best_value = 0
+    best_chosen = None
+    weight = volume = 0
+    for candidate in usable:
+        if weight + candidate[1] <= max_weight and volume + candidate[2] <= max_volume:
+            weight += candidate[1]
+            volume += candidate[2]
+            best_value += candidate[value_index]
+            best_chosen = (candidate[0], best_chosen)
+    
+    # Frames are (index, weight, volume, value, chosen ids as a linked list)
+    stack = [(0, 0, 0, 0, None)]
+    nodes = 0
+    optimal = True
+    while stack and best_value < target:
+        nodes += 1
+        if time_budget is not None and nodes % 1024 == 0 and time.perf_counter() - started > time_budget:
+            optimal = False
+            break
+        
+        index, weight, volume, value, chosen = stack.pop()
+        if value > best_value:
+            best_value = value
+            best_chosen = chosen
+        if index == len(usable):
+            continue
+        
+        if value + bound(index, weight, volume) <= best_value:
+            continue
+        
+        item_id, item_weight, item_volume = usable[index]
+        stack.append((index + 1, weight, volume, value, chosen))
+        if weight + item_weight <= max_weight and volume + item_volume <= max_volume:
+            stack.append((
+                index + 1,
+                weight + item_weight,
+                volume + item_volume,
+                value + usable[index][value_index],
+                (item_id, chosen)
+            ))
+    
+    selected = []
+    while best_chosen is not None:
+        item_id, best_chosen = best_chosen
+        selected.append(item_id)
+    return selected, optimal
+
+def fit_in_container(scratch, item_ids, backend=None):
+    """Place items into a scratch container, largest first.
+
+    Returns (positions by item id, ids that did not fit).
+    """
+    positions = {}
+    misfits = []
+    for item_id in sorted(item_ids, key=lambda id: -(items[id].width * items[id].depth * items[id].height)):
+        _, position = find_optimal_placement(items[item_id], [scratch], backend=backend, workers=0)
+        if position is None:
+            misfits.append(item_id)
+            continue
+        scratch.add_item(item_id, position["startCoordinates"], position["endCoordinates"])
+        positions[item_id] = position
+    return positions, misfits
+
+@timed
+def create_waste_return_plan(undocking_container_id, max_weight, max_volume=None, objective="mass", time_budget=None):
+    """Create a plan for returning waste items.
+
+    The waste to return is chosen to maximize returned mass (or volume, with
+    objective="volume") within max_weight and the free volume of the
+    undocking container, and the chosen items are checked to physically fit
+    in it. Items that do not fit are excluded and the choice is re-solved.
+    """
+    started = time.perf_counter()
+    time_budget = config.WASTE_PLAN_TIME_BUDGET if time_budget is None else time_budget
+    undocking_container = containers[undocking_container_id]
+    
     waste_items_list = identify_waste_items()
     waste_item_ids = [item["itemId"] for item in waste_items_list]
     
+    # Waste already in the undocking container needs no new space
+    already_aboard = {item_id for item_id in waste_item_ids if items[item_id].container_id == undocking_container_id}
+    
+    free_volume = undocking_container.width * undocking_container.depth * undocking_container.height
+    for item_id, box in undocking_container.boxes.items():
+        if item_id not in already_aboard:
+            free_volume -= box_volume(box)
+    if max_volume is not None:
+        free_volume = min(free_volume, max_volume)
+    
+    excluded = set()
+    optimal = True
+    while True:
+        candidates = [
+            (item_id, items[item_id].mass, items[item_id].width * items[item_id].depth * items[item_id].height)
+            for item_id in waste_item_ids if item_id not in excluded
+        ]
+        remaining_budget = max(time_budget - (time.perf_counter() - started), 0)
+        selected, solved = solve_return_knapsack(candidates, max_weight, free_volume, objective, remaining_budget)
+        optimal = optimal and solved
+        
+        # Waste already aboard keeps its place, the rest has to be packed
+        scratch = undocking_container.copy()
+        for item_id in already_aboard - set(selected):
+            scratch.remove_item(item_id)
+        positions, misfits = fit_in_container(scratch, [id for id in selected if id not in already_aboard])
+        if not misfits or time.perf_counter() - started > time_budget:
+            selected = [item_id for item_id in selected if item_id not in misfits]
+            break
+        excluded.update(misfits)
+    
     # Sort waste items by priority (lower priority first)
     sorted_waste = sorted(
-        [(item_id, items[item_id]) for item_id in waste_item_ids],
+        [(item_id, items[item_id]) for item_id in selected],
         key=lambda x: x[1].priority
     )
     
@@ -147,59 +1042,65 @@ def create_waste_return_plan(undocking_container_id, max_weight):
     retrieval_steps = []
     return_manifest = {
         "undockingContainerId": undocking_container_id,
-        "undockingDate": current_date,
+        "undockingDate": clock.get(),
         "returnItems": [],
         "totalVolume": 0,
-        "totalWeight": 0
+        "totalWeight": 0,
+        "objective": objective,
+        "optimal": optimal
     }
     
     step_number = 1
-    total_weight = 0
+    now = clock.now()
+    targets_by_container = {}
     
     for item_id, item in sorted_waste:
-        # Check if adding this item exceeds weight limit
-        if total_weight + item.mass > max_weight:
-            continue
-        
         # Add to return plan
         return_plan.append({
             "step": step_number,
             "itemId": item_id,
             "itemName": item.name,
             "fromContainer": item.container_id,
-            "toContainer": undocking_container_id
+            "toContainer": undocking_container_id,
+            "position": positions.get(item_id, item.position)
         })
         step_number += 1
         
-        # Calculate retrieval steps if needed
+        # Group retrievals by container so they can be merged below
         if item.container_id:
-            container = containers[item.container_id]
-            item_retrieval_steps = calculate_retrieval_steps(container, item_id)
-            retrieval_steps.extend(item_retrieval_steps)
+            targets_by_container.setdefault(item.container_id, []).append(item_id)
         
         # Add to manifest
         return_manifest["returnItems"].append({
             "itemId": item_id,
             "name": item.name,
-            "reason": "Expired" if item.expiry_date and parser.parse(current_date) > parser.parse(item.expiry_date) else "Out of Uses"
+            "reason": "Expired" if item.is_expired(now) else "Out of Uses"
         })
         
         # Update totals
         volume = item.width * item.depth * item.height
         return_manifest["totalVolume"] += volume
         return_manifest["totalWeight"] += item.mass
-        total_weight += item.mass
+    
+    # One retrieval sequence per container, so shared blockers move only once
+    unmerged_steps = 0
+    for container_id, target_ids in targets_by_container.items():
+        container = containers[container_id]
+        unmerged_steps += sum(3 * len(container.get_items_blocking(item_id)) + 1 for item_id in target_ids)
+        retrieval_steps.extend(merge_retrieval_steps(container, target_ids, len(retrieval_steps) + 1))
+    
+    return_manifest["retrievalStepCount"] = {
+        "unmerged": unmerged_steps,
+        "merged": len(retrieval_steps)
+    }
     
     return return_plan, retrieval_steps, return_manifest
 
+@timed
 def simulate_day(items_used):
     """Simulate a day passing in the system"""
-    global current_date
-    
     # Advance the date by one day
-    current_date_obj = parser.parse(current_date)
-    current_date_obj = current_date_obj.replace(day=current_date_obj.day + 1)
-    current_date = current_date_obj.isoformat()
+    _, current_date_obj = clock.advance(1)
     
     changes = {
         "itemsUsed": [],
@@ -227,16 +1128,99 @@ def simulate_day(items_used):
                     "name": item.name
                 })
     
-    # Check for newly expired items
-    for item_id, item in items.items():
-        if item.expiry_date and item.expiry_date != "N/A":
-            expiry_date = parser.parse(item.expiry_date)
-            if current_date_obj > expiry_date:
-                # Item is expired
-                changes["itemsExpired"].append({
-                    "itemId": item_id,
-                    "name": item.name,
-                    "expiryDate": item.expiry_date
-                })
+    # Check for expired items, using the expiry index so only they are visited
+    for item_id in items.expiring_before(current_date_obj):
+        item = items[item_id]
+        changes["itemsExpired"].append({
+            "itemId": item_id,
+            "name": item.name,
+            "expiryDate": item.expiry_date
+        })
+    
+    return current_date_obj.isoformat(), changes
+
+@timed
+def simulate_days(num_days, items_used_per_day=(), usage_schedule=None):
+    """Fast-forward the simulation by several days at once.
+
+    items_used_per_day are used once on every day and usage_schedule is an
+    optional list with the ids used on each day. Usage and expiry are worked
+    out for the whole period with array operations. Unlike simulate_day, the
+    expired items reported are only those that expire during the period.
+    """
+    changes = {
+        "itemsUsed": [],
+        "itemsExpired": [],
+        "itemsOutOfUses": []
+    }
+    if num_days <= 0:
+        return clock.get(), changes, []
+    
+    start, _ = clock.advance(num_days)
+    dates = [start + timedelta(days=day + 1) for day in range(num_days)]
+    
+    # Usage counts per day for every item that gets used
+    used_ids = []
+    for item_id in list(items_used_per_day) + [item_id for day_ids in (usage_schedule or []) for item_id in day_ids]:
+        if item_id in items and items[item_id].uses_remaining is not None and item_id not in used_ids:
+            used_ids.append(item_id)
+    column = {item_id: index for index, item_id in enumerate(used_ids)}
+    
+    usage = np.zeros((num_days, len(used_ids)), dtype=np.int64)
+    for item_id in items_used_per_day:
+        if item_id in column:
+            usage[:, column[item_id]] += 1
+    for day, day_ids in enumerate((usage_schedule or [])[:num_days]):
+        for item_id in day_ids:
+            if item_id in column:
+                usage[day, column[item_id]] += 1
+    
+    uses = np.array([items[item_id].uses_remaining for item_id in used_ids], dtype=np.int64)
+    remaining = np.maximum(uses - usage.cumsum(axis=0), 0)
+    previous = np.vstack([np.maximum(uses, 0)[np.newaxis, :], remaining[:-1]])
+    uses_per_day = (previous - remaining).sum(axis=1)
+    
+    # Day on which each item runs out of uses, or -1
+    ran_out = (remaining == 0) & (uses > 0)
+    out_day = np.where(ran_out.any(axis=0), ran_out.argmax(axis=0), -1)
+    
+    # Day on which each item expires: the first simulated date past its expiry
+    expiring_ids = items.expiring_between(start, dates[-1])
+    expiry_dates = np.array([items[item_id].expiry_micros for item_id in expiring_ids], dtype=np.int64).astype("datetime64[us]")
+    expiry_day = np.searchsorted(np.array(dates, dtype="datetime64[us]"), expiry_dates, side="right")
+    
+    daily_changes = [
+        {
+            "date": date.isoformat(),
+            "usesApplied": int(uses_per_day[day]),
+            "itemsExpired": [],
+            "itemsOutOfUses": []
+        }
+        for day, date in enumerate(dates)
+    ]
+    
+    for index, item_id in enumerate(used_ids):
+        item = items[item_id]
+        item.consume(int(uses[index] - remaining[-1, index]))
+        changes["itemsUsed"].append({
+            "itemId": item_id,
+            "name": item.name,
+            "usesRemaining": item.uses_remaining
+        })
+        if out_day[index] >= 0:
+            daily_changes[out_day[index]]["itemsOutOfUses"].append(item_id)
+            changes["itemsOutOfUses"].append({
+                "itemId": item_id,
+                "name": item.name
+            })
+    
+    for item_id, day in zip(expiring_ids, expiry_day):
+        item = items[item_id]
+        daily_changes[day]["itemsExpired"].append(item_id)
+        changes["itemsExpired"].append({
+            "itemId": item_id,
+            "name": item.name,
+            "expiryDate": item.expiry_date
+        })
     
-    return current_date, changes
+    return dates[-1].isoformat(), changes, daily_changes
@@ -1,12 +1,16 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
-import os
 
-from routes import placement, search, waste, simulation, import_export, logs
+from routes import placement, search, waste, simulation, import_export, logs, metrics, jobs
+from persistence import journal
+import instrumentation
 
 app = Flask(__name__)
 CORS(app)
 
+# Request latency metrics and sampled profiling
+instrumentation.init_app(app)
+
 # Register blueprints
 app.register_blueprint(placement.bp)
 app.register_blueprint(search.bp)
@@ -14,6 +18,11 @@ app.register_blueprint(waste.bp)
 app.register_blueprint(simulation.bp)
 app.register_blueprint(import_export.bp)
 app.register_blueprint(logs.bp)
+app.register_blueprint(metrics.bp)
+app.register_blueprint(jobs.bp)
+
+# Restore the saved station and journal changes, if persistence is enabled
+journal.open()
 
 @app.route('/')
 def index():
@@ -0,0 +1,245 @@
+"""Streaming export of the station arrangement.
+
+Placed items are exported container by container, so every format can be
+written incrementally without building the whole file in memory. Formats:
+
+- csv: the original "Item ID, Container ID, Coordinates" layout
+- npy: a NumPy structured array with fields itemId, containerId, start and
+  end (int32 width, depth, height triples)
+- bin: struct-packed little-endian records of a uint16 length-prefixed item
+  id, a uint16 length-prefixed container id and six int32 coordinates
+- parquet / arrow: columns itemId, containerId, startWidth ... endHeight,
+  written one record batch per container (requires pyarrow)
+"""
+import csv
+import io
+import struct
+
+import numpy as np
+
+from models import items, containers
+from concurrency import read_locked
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Rows written between flushes of the text and binary formats
+FLUSH_ROWS = 2000
+
+AXES = ("width", "depth", "height")
+COORDINATE_COLUMNS = [f"{end}{axis.capitalize()}" for end in ("start", "end") for axis in AXES]
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "npy": ("application/octet-stream", "npy"),
+    "bin": ("application/octet-stream", "bin"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+ARROW_FORMATS = ("parquet", "arrow")
+
+
+def select_containers(container_ids=None, zone=None):
+    """Get the ids of containers holding items, optionally filtered by id and zone"""
+    if container_ids:
+        selected = [container_id for container_id in container_ids if container_id in items.by_container]
+    else:
+        selected = sorted(items.by_container)
+    if zone:
+        selected = [
+            container_id for container_id in selected
+            if container_id in containers and containers[container_id].zone == zone
+        ]
+    return selected
+
+
+def container_rows(container_id):
+    """Get (item id, box) for each placed item in a container"""
+    rows = []
+    with items.lock:
+        for item_id in items.in_container(container_id):
+            box = items[item_id].box
+            if box is not None:
+                rows.append((item_id, box))
+    return rows
+
+
+def snapshot_rows(container_ids):
+    """Get (container id, rows) for every container at one moment.
+
+    The containers' read locks keep placements out while the rows are read,
+    so the rows are consistent across containers.
+    """
+    selected = [containers[container_id] for container_id in container_ids if container_id in containers]
+    with read_locked(selected):
+        return [(container_id, container_rows(container_id)) for container_id in container_ids]
+
+
+def csv_chunks(container_ids):
+    """Yield the arrangement as CSV text"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Item ID', 'Container ID', 'Coordinates (W1,D1,H1),(W2,D2,H2)'])
+
+    pending = 0
+    for container_id in container_ids:
+        for item_id, box in container_rows(container_id):
+            coordinates = "({},{},{}),({},{},{})".format(*box)
+            writer.writerow([item_id, container_id, coordinates])
+            pending += 1
+            if pending >= FLUSH_ROWS:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+                pending = 0
+    yield output.getvalue()
+
+
+def npy_chunks(container_ids):
+    """Yield the arrangement as a .npy structured array, one container at a time.
+
+    The header holds the row count, so every row is read before it is written.
+    """
+    snapshot = snapshot_rows(container_ids)
+    item_length = max((len(item_id) for _, rows in snapshot for item_id, _ in rows), default=1)
+    container_length = max((len(container_id) for container_id in container_ids), default=1)
+    dtype = np.dtype([
+        ("itemId", f"U{item_length}"),
+        ("containerId", f"U{container_length}"),
+        ("start", "<i4", (3,)),
+        ("end", "<i4", (3,)),
+    ])
+
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, {
+        "descr": np.lib.format.dtype_to_descr(dtype),
+        "fortran_order": False,
+        "shape": (sum(len(rows) for _, rows in snapshot),)
+    })
+    yield header.getvalue()
+
+    for container_id, rows in snapshot:
+        records = np.empty(len(rows), dtype=dtype)
+        boxes = np.array([box for _, box in rows], dtype="<i4").reshape(-1, 6)
+        records["itemId"] = [item_id for item_id, _ in rows]
+        records["containerId"] = container_id
+        records["start"] = boxes[:, :3]
+        records["end"] = boxes[:, 3:]
+        yield records.tobytes()
+
+
+def bin_chunks(container_ids):
+    """Yield the arrangement as struct-packed records"""
+    coordinates = struct.Struct("<6i")
+    length = struct.Struct("<H")
+    output = bytearray()
+
+    pending = 0
+    for container_id in container_ids:
+        encoded_container = container_id.encode()
+        container_prefix = length.pack(len(encoded_container)) + encoded_container
+        for item_id, box in container_rows(container_id):
+            encoded_item = item_id.encode()
+            output += length.pack(len(encoded_item))
+            output += encoded_item
+            output += container_prefix
+            output += coordinates.pack(*map(int, box))
+            pending += 1
+            if pending >= FLUSH_ROWS:
+                yield bytes(output)
+                output.clear()
+                pending = 0
+    yield bytes(output)
+
+
+def arrow_batches(container_ids):
+    """Yield one Arrow record batch per container"""
+    schema = arrow_schema()
+    for container_id in container_ids:
+        rows = container_rows(container_id)
+        if not rows:
+            continue
+        columns = {
+            "itemId": [item_id for item_id, _ in rows],
+            "containerId": [container_id] * len(rows),
+        }
+        for index, name in enumerate(COORDINATE_COLUMNS):
+            # Boxes are (x0, y0, z0, x1, y1, z1), the order of COORDINATE_COLUMNS
+            columns[name] = [box[index] for _, box in rows]
+        yield pa.record_batch([columns[field.name] for field in schema], schema=schema)
+
+
+def arrow_schema():
+    return pa.schema(
+        [("itemId", pa.string()), ("containerId", pa.string())]
+        + [(name, pa.int32()) for name in COORDINATE_COLUMNS]
+    )
+
+
+class ChunkSink:
+    """Write-only file that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_chunks(container_ids, file_format):
+    """Yield the arrangement as Parquet or an Arrow IPC stream"""
+    sink = ChunkSink()
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(sink, arrow_schema())
+    else:
+        writer = pa.ipc.new_stream(sink, arrow_schema())
+
+    for batch in arrow_batches(container_ids):
+        if file_format == "parquet":
+            writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            writer.write_batch(batch)
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def export_chunks(file_format, container_ids):
+    """Get a generator of the arrangement in the given format"""
+    if file_format == "csv":
+        return csv_chunks(container_ids)
+    if file_format == "npy":
+        return npy_chunks(container_ids)
+    if file_format == "bin":
+        return bin_chunks(container_ids)
+    return arrow_chunks(container_ids, file_format)
@@ -0,0 +1,128 @@
+"""Hammer placement, search and retrieval from many threads and check the result.
+
+Run from the backend directory:
+
+    python -m benchmarks.concurrency [threads]
+
+Every thread places its own items through /api/placement, moves some of them
+with /api/place, and searches for and retrieves items placed by all threads.
+Afterwards the station must have no overlapping items, every item's recorded
+position must match its container, every retrieval must be reflected in the
+item's remaining uses, and every request must have been logged.
+"""
+import random
+import sys
+import threading
+import time
+
+import app
+from models import items, containers, logs
+from benchmarks.generators import make_containers, make_manifest
+
+THREADS = 8
+CONTAINERS = 4
+ITEMS_PER_THREAD = 40
+RETRIEVALS_PER_THREAD = 200
+USAGE_LIMIT = 10000
+SIZE_CLASSES = [(1.0, 3, 6)]
+
+# Fields of Item.to_dict that /api/placement takes
+PAYLOAD_KEYS = {
+    "itemId", "name", "width", "depth", "height", "mass",
+    "priority", "expiryDate", "usageLimit", "preferredZone"
+}
+
+retrievals_lock = threading.Lock()
+
+
+def make_station():
+    """Replace the station with a few small containers that fill up quickly"""
+    items.clear()
+    containers.clear()
+    logs.clear()
+    for container in make_containers(CONTAINERS, shapes=[(40, 40, 40)], prefix="hammer"):
+        containers[container.container_id] = container
+
+
+def worker(thread_id, retrievals, errors):
+    client = app.app.test_client()
+    rng = random.Random(thread_id)
+    placed = []
+    try:
+        for item in make_manifest(ITEMS_PER_THREAD, thread_id, prefix=f"t{thread_id}-", size_classes=SIZE_CLASSES):
+            payload = {key: value for key, value in item.to_dict().items() if key in PAYLOAD_KEYS}
+            payload["usageLimit"] = USAGE_LIMIT
+            response = client.post('/api/placement', json={"items": [payload], "containers": []}).get_json()
+            if response["placements"]:
+                placed.append(item.item_id)
+
+        # Move a few items back to where they already are, through the manual place endpoint
+        for item_id in placed[:5]:
+            item = items[item_id]
+            client.post('/api/place', json={
+                "itemId": item_id, "userId": f"user{thread_id}",
+                "containerId": item.container_id, "position": item.position
+            })
+
+        for _ in range(RETRIEVALS_PER_THREAD):
+            item_id = f"t{rng.randrange(THREADS)}-{rng.randrange(ITEMS_PER_THREAD):06d}"
+            if item_id not in items:
+                continue
+            client.get('/api/search', query_string={"itemId": item_id})
+            if client.post('/api/retrieve', json={"itemId": item_id, "userId": f"user{thread_id}"}).get_json()["success"]:
+                with retrievals_lock:
+                    retrievals[item_id] = retrievals.get(item_id, 0) + 1
+    except Exception as e:
+        errors.append(f"thread {thread_id}: {e!r}")
+
+
+def check(retrievals):
+    """Get a list of consistency problems"""
+    problems = []
+    for container in containers.values():
+        for item_id, box in container.boxes.items():
+            if container.get_boxes_overlapping(box, exclude=item_id):
+                problems.append(f"{item_id} overlaps another item in {container.container_id}")
+            item = items.get(item_id)
+            if item is None or item.container_id != container.container_id:
+                problems.append(f"{item_id} is in {container.container_id} but the item says otherwise")
+            elif item.box != box:
+                problems.append(f"{item_id} position differs from {container.container_id}")
+        indexed = set(items.in_container(container.container_id))
+        if indexed != set(container.boxes):
+            problems.append(f"container index of {container.container_id} is out of date")
+
+    for item_id, count in retrievals.items():
+        if items[item_id].uses_remaining != USAGE_LIMIT - count:
+            problems.append(f"{item_id}: {count} retrievals but {USAGE_LIMIT - items[item_id].uses_remaining} uses recorded")
+
+    logged, _ = logs.query(action_type="retrieval")
+    if len(logged) != sum(retrievals.values()):
+        problems.append(f"{sum(retrievals.values())} retrievals but {len(logged)} logged")
+    return problems
+
+
+if __name__ == "__main__":
+    THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else THREADS
+    # Switch threads often to make interleavings likely
+    sys.setswitchinterval(1e-5)
+    make_station()
+    retrievals = {}
+    errors = []
+    threads = [threading.Thread(target=worker, args=(thread_id, retrievals, errors)) for thread_id in range(THREADS)]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    problems = errors + check(retrievals)
+    placed = sum(len(container.boxes) for container in containers.values())
+    print(f"{THREADS} threads, {elapsed:.2f}s: {placed} items placed, {sum(retrievals.values())} retrievals")
+    if problems:
+        for problem in problems[:20]:
+            print("FAIL:", problem)
+        sys.exit(1)
+    print("no overlaps, lost updates or missing log entries")
@@ -0,0 +1,91 @@
+"""Seeded synthetic stations for benchmarks.
+
+Containers come in the shapes of the sample station's modules and lockers.
+Item sizes follow a long-tailed mix: most items are small packs, some are
+medium kits and a few are large equipment. Mass follows volume at a random
+density, priorities lean high, and expiry dates and usage limits are spread
+like consumables and tools. Benchmarks that need a smaller station pass
+their own container shapes or size classes. The same seed always gives the
+same station.
+"""
+import random
+from datetime import datetime, timedelta
+
+from models import Container, Item
+
+ZONES = ["Crew Quarters", "Airlock", "Laboratory", "Medical Bay", "Storage", "Command Center"]
+
+# (width, depth, height) in cm
+CONTAINER_SHAPES = [(100, 85, 200), (50, 85, 200), (200, 85, 200), (60, 60, 60), (120, 50, 80)]
+
+# (share of items, smallest edge, largest edge) in cm
+SIZE_CLASSES = [(0.6, 3, 15), (0.3, 15, 35), (0.1, 35, 60)]
+
+USAGE_LIMITS = [1, 5, 10, 30, 100, 1000]
+
+START_DATE = datetime(2025, 1, 1)
+
+
+def make_containers(count, seed=0, shapes=CONTAINER_SHAPES, prefix="cont", index_class=None):
+    """Build count empty containers spread across the zones"""
+    rng = random.Random(seed)
+    return [
+        Container(
+            f"{prefix}{index:03d}", ZONES[index % len(ZONES)], *rng.choice(shapes),
+            index=index_class() if index_class else None
+        )
+        for index in range(count)
+    ]
+
+
+def fill_randomly(containers, count, seed=0, sizes=(3, 10)):
+    """Add count seeded boxes to each container; the boxes may overlap each other"""
+    rng = random.Random(seed)
+    for container in containers:
+        for number in range(count):
+            size = [rng.randint(*sizes) for _ in range(3)]
+            start = {
+                "width": rng.randrange(0, max(1, int(container.width) - sizes[1])),
+                "depth": rng.randrange(0, max(1, int(container.depth) - sizes[1])),
+                "height": rng.randrange(0, max(1, int(container.height) - sizes[1]))
+            }
+            end = {
+                "width": start["width"] + size[0],
+                "depth": start["depth"] + size[1],
+                "height": start["height"] + size[2]
+            }
+            container.add_item(f"fill-{container.container_id}-{number}", start, end)
+    return containers
+
+
+def item_edge(rng, size_classes=SIZE_CLASSES):
+    """Draw an edge length from the size classes"""
+    draw = rng.random()
+    for share, low, high in size_classes:
+        if draw < share:
+            return rng.randint(low, high)
+        draw -= share
+    return rng.randint(size_classes[-1][1], size_classes[-1][2])
+
+
+def make_manifest(count, seed=0, prefix="item", start_date=START_DATE, size_classes=SIZE_CLASSES):
+    """Build count items; about a third never expire and the rest expire within a year"""
+    rng = random.Random(seed)
+    manifest = []
+    for index in range(count):
+        # Items are roughly cubic with some elongation
+        edge = item_edge(rng, size_classes)
+        width = max(1, round(edge * rng.uniform(0.5, 1.5)))
+        depth = max(1, round(edge * rng.uniform(0.5, 1.5)))
+        height = max(1, round(edge * rng.uniform(0.5, 1.5)))
+        mass = round(width * depth * height / 1000 * rng.uniform(0.2, 1.5), 2)
+        expiry = None
+        if rng.random() >= 0.35:
+            expiry = (start_date + timedelta(days=rng.randint(1, 365))).date().isoformat()
+        manifest.append(Item(
+            f"{prefix}{index:06d}", f"Item {index % 500}",
+            width, depth, height, max(mass, 0.01),
+            int(rng.triangular(1, 100, 70)), expiry,
+            rng.choice(USAGE_LIMITS), rng.choice(ZONES)
+        ))
+    return manifest
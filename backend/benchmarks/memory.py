@@ -0,0 +1,115 @@
+"""Measure the memory used by the station state and by placement.
+
+Run from the backend directory:
+
+    python -m benchmarks.memory [items]
+
+A seeded station of 100k items (by default) is stored and placed on a
+lattice, and the traced memory per item is reported for the items alone,
+for the placed station, and for its serialized API form. A manifest is then
+packed into a partly filled container to show the memory allocated by the
+placement search itself.
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from models import items, containers, Container
+from algorithms import pack_manifest
+from benchmarks.generators import ZONES, make_manifest
+
+ITEMS = 100000
+SLOT = 10
+CONTAINER_SIZE = 200
+MANIFEST = 300
+# Items stretch to 1.5 times their drawn edge, so every item fits in its slot
+SIZE_CLASSES = [(1.0, 1, 6)]
+
+
+def make_items(count, seed=0):
+    """Build a seeded list of items small enough for the lattice slots"""
+    return make_manifest(count, seed, size_classes=SIZE_CLASSES)
+
+
+def place_on_lattice(station_items):
+    """Put every item in its own 10 cm slot, filling containers in turn"""
+    per_axis = CONTAINER_SIZE // SLOT
+    per_container = per_axis ** 3
+    for index, item in enumerate(station_items):
+        number, slot = divmod(index, per_container)
+        container_id = f"lattice{number}"
+        if container_id not in containers:
+            containers[container_id] = Container(
+                container_id, item.preferred_zone, CONTAINER_SIZE, CONTAINER_SIZE, CONTAINER_SIZE
+            )
+        x, rest = divmod(slot, per_axis ** 2)
+        y, z = divmod(rest, per_axis)
+        start = {"width": x * SLOT, "depth": y * SLOT, "height": z * SLOT}
+        end = {
+            "width": start["width"] + item.width,
+            "depth": start["depth"] + item.depth,
+            "height": start["height"] + item.height
+        }
+        containers[container_id].restore_item(item.item_id, start, end)
+        item.set_position(container_id, {"startCoordinates": start, "endCoordinates": end})
+
+
+def traced(step):
+    """Run step and get (traced bytes it left allocated, peak bytes, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = step()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def measure(count):
+    items.clear()
+    containers.clear()
+
+    station_items, item_bytes, _, _ = traced(lambda: make_items(count))
+    _, store_bytes, _, _ = traced(lambda: items.add_many(station_items))
+    _, place_bytes, _, place_time = traced(lambda: place_on_lattice(station_items))
+    _, _, api_peak, api_time = traced(lambda: [item.to_dict() for item in items.values()])
+
+    # Pack a manifest into a container that is already half full
+    container = Container("pack", ZONES[0], CONTAINER_SIZE, CONTAINER_SIZE, CONTAINER_SIZE)
+    for item in station_items[:4000]:
+        position = item.position
+        container.restore_item(item.item_id, position["startCoordinates"], position["endCoordinates"])
+    manifest = make_items(MANIFEST, seed=1)
+    plan, _, pack_peak, pack_time = traced(lambda: pack_manifest(manifest, [container]))
+
+    return {
+        "items": count,
+        "itemBytes": item_bytes / count,
+        "storeBytes": store_bytes / count,
+        "placementBytes": place_bytes / count,
+        "placeSeconds": place_time,
+        "apiPeakBytes": api_peak / count,
+        "apiSeconds": api_time,
+        "packPeakBytes": pack_peak,
+        "packSeconds": pack_time,
+        "packPlaced": len(plan["placements"])
+    }
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ITEMS
+    result = measure(count)
+    total = result["itemBytes"] + result["storeBytes"] + result["placementBytes"]
+    print(f"{result['items']} items, bytes per item:")
+    print(f"  item objects     {result['itemBytes']:8.0f}")
+    print(f"  store indexes    {result['storeBytes']:8.0f}")
+    print(f"  placement        {result['placementBytes']:8.0f}  ({result['placeSeconds']:.2f}s)")
+    print(f"  total            {total:8.0f}  ({total * result['items'] / 2 ** 20:.0f} MiB)")
+    print(f"  to_dict (peak)   {result['apiPeakBytes']:8.0f}  ({result['apiSeconds']:.2f}s)")
+    print(
+        f"pack {MANIFEST} items into a half full container: {result['packPlaced']} placed, "
+        f"{result['packPeakBytes'] / 2 ** 20:.1f} MiB peak, {result['packSeconds']:.2f}s"
+    )
@@ -0,0 +1,85 @@
+"""Compare the occupancy-grid backend against list-based overlap checks.
+
+Run from the backend directory:
+
+    python -m benchmarks.occupancy_grid
+
+A 250 cm cube is filled with 100, 1k and 10k seeded items and the time to
+find a placement for a probe item is measured with the extreme-point search
+over a plain list (LinearIndex), over the voxel-bucket GridIndex, and with
+the NumPy occupancy grid at two resolutions. Before each timed search one
+more item is placed, so grid timings include bringing the bitmap up to date
+after a placement. The first, cold build of a grid is reported separately.
+"""
+import random
+import time
+
+import config
+from models import Container, Item
+from spatial_index import LinearIndex, GridIndex
+from algorithms import find_optimal_placement
+
+SIZE = 250
+SLOT = 10
+SIZES = [100, 1000, 10000]
+REPEATS = 3
+
+
+def fill_container(count, index_class, seed=0):
+    """Place items at seeded slots of a 10 cm lattice, getting the container and the free slots"""
+    rng = random.Random(seed)
+    container = Container("bench", "Storage", SIZE, SIZE, SIZE, index=index_class())
+    slots_per_axis = SIZE // SLOT
+    slots = rng.sample(range(slots_per_axis ** 3), count + REPEATS + 1)
+    for index, slot in enumerate(slots[:count]):
+        start = slot_corner(slot)
+        end = {
+            "width": start["width"] + rng.choice((5, 10)),
+            "depth": start["depth"] + rng.choice((5, 10)),
+            "height": start["height"] + rng.choice((5, 10))
+        }
+        container.add_item(f"item{index}", start, end)
+    return container, slots[count:]
+
+
+def slot_corner(slot):
+    slots_per_axis = SIZE // SLOT
+    x, rest = divmod(slot, slots_per_axis ** 2)
+    y, z = divmod(rest, slots_per_axis)
+    return {"width": x * SLOT, "depth": y * SLOT, "height": z * SLOT}
+
+
+def time_placement(filled, backend, resolution=None):
+    """Get the cold time and the best time after a placement to place a probe item"""
+    container, free_slots = filled
+    if resolution:
+        config.OCCUPANCY_RESOLUTION = resolution
+    probe = Item("probe", "Probe", 20, 20, 20, 1, 50, None, 1, "Storage")
+    started = time.perf_counter()
+    find_optimal_placement(probe, [container], backend=backend)
+    cold = time.perf_counter() - started
+    best = float("inf")
+    position = None
+    for repeat in range(REPEATS):
+        # A placement changes the container, as between two real searches
+        start = slot_corner(free_slots[repeat])
+        end = {axis: value + 5 for axis, value in start.items()}
+        container.add_item(f"extra{repeat}", start, end)
+        started = time.perf_counter()
+        _, position = find_optimal_placement(probe, [container], backend=backend)
+        best = min(best, time.perf_counter() - started)
+    return cold, best, position
+
+
+if __name__ == "__main__":
+    print(f"{'items':>6} {'list':>10} {'grid index':>11} {'numpy r=5':>10} {'numpy r=1':>10} {'r=1 cold':>10}")
+    for count in SIZES:
+        _, linear_time, linear_position = time_placement(fill_container(count, LinearIndex), "extreme_point")
+        _, grid_time, _ = time_placement(fill_container(count, GridIndex), "extreme_point")
+        _, coarse_time, _ = time_placement(fill_container(count, GridIndex), "occupancy", 5)
+        fine_cold, fine_time, fine_position = time_placement(fill_container(count, GridIndex), "occupancy", 1)
+        assert fine_position == linear_position, (fine_position, linear_position)
+        print(
+            f"{count:>6} {linear_time * 1000:>8.1f}ms {grid_time * 1000:>9.1f}ms "
+            f"{coarse_time * 1000:>8.1f}ms {fine_time * 1000:>8.1f}ms {fine_cold * 1000:>8.1f}ms"
+        )
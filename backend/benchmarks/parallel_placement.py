@@ -0,0 +1,53 @@
+"""Compare serial and process-pool placement search.
+
+Run from the backend directory:
+
+    python -m benchmarks.parallel_placement [workers]
+
+A seeded station of 24 partly filled containers receives the same manifest
+twice, once searched serially and once on the process pool. The placements
+must be identical.
+"""
+import os
+import sys
+import time
+
+from algorithms import find_optimal_placement
+from benchmarks.generators import make_containers, make_manifest, fill_randomly
+
+CONTAINERS = 24
+PREFILLED = 400
+ITEMS = 40
+SIZE_CLASSES = [(1.0, 5, 20)]
+
+
+def make_station(seed):
+    """Build a seeded station whose containers are already partly filled"""
+    station = make_containers(CONTAINERS, seed, [(100, 85, 200)], prefix="bench")
+    return fill_randomly(station, PREFILLED, seed)
+
+
+def place_all(station, workers):
+    """Place the manifest and get the placements and elapsed time"""
+    placements = []
+    started = time.perf_counter()
+    for item in make_manifest(ITEMS, 1, size_classes=SIZE_CLASSES):
+        container, position = find_optimal_placement(item, station, workers=workers)
+        if container:
+            container.add_item(item.item_id, position["startCoordinates"], position["endCoordinates"])
+            placements.append((item.item_id, container.container_id, position))
+        else:
+            placements.append((item.item_id, None, None))
+    return placements, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    serial, serial_time = place_all(make_station(0), 0)
+    parallel, parallel_time = place_all(make_station(0), workers)
+    print(f"serial:   {serial_time:.2f}s")
+    print(f"parallel: {parallel_time:.2f}s ({workers} workers)")
+    if serial != parallel:
+        print("FAIL: placements differ")
+        sys.exit(1)
+    print(f"{len(serial)} placements identical")
@@ -0,0 +1,89 @@
+"""Compare the extreme-point placement engine against the unit-step scan.
+
+Run from the backend directory:
+
+    python -m benchmarks.placement_engine
+
+Every item is placed by both engines on identical copies of a seeded station.
+The extreme-point engine must always find a placement with an equal or better
+score, and the report shows how many candidate positions each one evaluated.
+"""
+import sys
+import time
+
+from spatial_index import LinearIndex
+from algorithms import (
+    find_optimal_placement,
+    find_optimal_placement_exhaustive,
+    placement_score,
+)
+from benchmarks.generators import make_containers, make_manifest
+
+# Small containers and items keep the exhaustive scan tractable
+SHAPES = [(20, 30, 40), (30, 30, 30), (40, 25, 20), (35, 40, 30)]
+SIZE_CLASSES = [(1.0, 3, 10)]
+CONTAINERS = 3
+
+
+def run(seed=0, count=40):
+    """Place a manifest with both engines and check the scores agree"""
+    fast_station = make_containers(CONTAINERS, seed, SHAPES, prefix="bench")
+    # The reference scan runs against the original full-list overlap check
+    slow_station = make_containers(CONTAINERS, seed, SHAPES, prefix="bench", index_class=LinearIndex)
+    fast_stats = {}
+    slow_stats = {}
+    fast_time = 0.0
+    slow_time = 0.0
+    failures = []
+
+    for item in make_manifest(count, seed, size_classes=SIZE_CLASSES):
+        started = time.perf_counter()
+        fast_container, fast_position = find_optimal_placement(item, fast_station, fast_stats)
+        fast_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        slow_container, slow_position = find_optimal_placement_exhaustive(item, slow_station, slow_stats)
+        slow_time += time.perf_counter() - started
+
+        if slow_container and not fast_container:
+            failures.append((item.item_id, "missed a placement"))
+            continue
+
+        if fast_container and slow_container:
+            fast_score = placement_score(item, fast_container, fast_position["startCoordinates"]["depth"])
+            slow_score = placement_score(item, slow_container, slow_position["startCoordinates"]["depth"])
+            if fast_score < slow_score:
+                failures.append((item.item_id, f"score {fast_score} < {slow_score}"))
+
+        # Keep both stations identical so later items are compared fairly
+        if fast_container:
+            start = fast_position["startCoordinates"]
+            end = fast_position["endCoordinates"]
+            for station in (fast_station, slow_station):
+                for container in station:
+                    if container.container_id == fast_container.container_id:
+                        container.add_item(item.item_id, start, end)
+
+    return {
+        "extremePointCandidates": fast_stats.get("candidatesEvaluated", 0),
+        "exhaustiveCandidates": slow_stats.get("candidatesEvaluated", 0),
+        "extremePointSeconds": fast_time,
+        "exhaustiveSeconds": slow_time,
+        "failures": failures
+    }
+
+
+if __name__ == "__main__":
+    all_passed = True
+    for seed in range(3):
+        result = run(seed)
+        ratio = result["exhaustiveCandidates"] / max(result["extremePointCandidates"], 1)
+        print(
+            f"seed={seed} candidates {result['extremePointCandidates']} vs "
+            f"{result['exhaustiveCandidates']} ({ratio:.0f}x fewer), "
+            f"time {result['extremePointSeconds']:.3f}s vs {result['exhaustiveSeconds']:.3f}s"
+        )
+        for item_id, message in result["failures"]:
+            all_passed = False
+            print(f"  FAIL {item_id}: {message}")
+    sys.exit(0 if all_passed else 1)
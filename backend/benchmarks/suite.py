@@ -0,0 +1,241 @@
+"""Benchmark the placement, search, waste and simulation paths on a synthetic station.
+
+Run from the backend directory:
+
+    python -m benchmarks.suite [--scale small|medium|large] [--seed N] [--output FILE] [--no-memory]
+
+A seeded station (see benchmarks.generators) is filled item by item through
+find_and_place, as /api/placement does. Retrieval steps are then worked out
+for a sample of placed items, return plans into an empty undocking container
+are built for the waste half a year later, and the simulation is
+fast-forwarded. Each path reports its throughput, latency percentiles and,
+unless --no-memory is given, its peak traced memory from a second identical
+run under tracemalloc (kept separate so tracing does not inflate timings).
+
+Results are written as JSON, by default to suite-<commit>-<scale>.json, so
+runs on different commits can be compared.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import config
+from models import items, containers, logs, clock, box_volume, Container
+from algorithms import find_and_place, calculate_retrieval_steps, create_waste_return_plan, simulate_days
+from placement_cache import placement_cache
+from benchmarks.generators import make_containers, make_manifest, START_DATE
+
+# (containers, items)
+SCALES = {
+    "small": (24, 1000),
+    "medium": (60, 3000),
+    "large": (200, 10000)
+}
+SEARCH_SAMPLES = 500
+WASTE_REPEATS = 3
+WASTE_MAX_WEIGHT = 500
+UNDOCKING_SHAPE = (100, 85, 200)
+SIMULATION_DAYS = 30
+SIMULATION_REPEATS = 3
+SIMULATION_ITEMS_PER_DAY = 50
+
+
+def latency_summary(latencies):
+    """Get mean and percentile latencies in milliseconds"""
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "meanMs": sum(ordered) / len(ordered) * 1000,
+        "p50Ms": percentile(0.5),
+        "p90Ms": percentile(0.9),
+        "p99Ms": percentile(0.99),
+        "maxMs": ordered[-1] * 1000
+    }
+
+
+def reset_station(container_count, seed):
+    items.clear()
+    containers.clear()
+    logs.clear()
+    placement_cache.clear()
+    clock.set(START_DATE)
+    for container in make_containers(container_count, seed):
+        containers[container.container_id] = container
+
+
+def bench_placement(manifest):
+    latencies = []
+    placed = 0
+    started = time.perf_counter()
+    for item in manifest:
+        items[item.item_id] = item
+        item_started = time.perf_counter()
+        container, _ = find_and_place(item, list(containers.values()))
+        latencies.append(time.perf_counter() - item_started)
+        if container is not None:
+            placed += 1
+    elapsed = time.perf_counter() - started
+
+    total_volume = sum(c.width * c.depth * c.height for c in containers.values())
+    used_volume = sum(box_volume(box) for c in containers.values() for box in c.boxes.values())
+    return {
+        "items": len(manifest),
+        "placed": placed,
+        "unplaced": len(manifest) - placed,
+        "seconds": elapsed,
+        "itemsPerSecond": placed / elapsed if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        "utilization": used_volume / total_volume if total_volume else 0.0,
+        "cache": placement_cache.stats()
+    }
+
+
+def bench_search(rng):
+    placed_ids = [item_id for item_id, item in items.items() if item.container_id]
+    sample = rng.sample(placed_ids, min(SEARCH_SAMPLES, len(placed_ids)))
+    latencies = []
+    steps = 0
+    started = time.perf_counter()
+    for item_id in sample:
+        item_started = time.perf_counter()
+        steps += len(calculate_retrieval_steps(containers[items[item_id].container_id], item_id))
+        latencies.append(time.perf_counter() - item_started)
+    elapsed = time.perf_counter() - started
+    return {
+        "searches": len(sample),
+        "seconds": elapsed,
+        "searchesPerSecond": len(sample) / elapsed if elapsed else 0.0,
+        "meanRetrievalSteps": steps / len(sample) if sample else 0.0,
+        "latency": latency_summary(latencies)
+    }
+
+
+def bench_waste():
+    # Half a year on, about half of the expiring items have expired
+    clock.set(START_DATE + timedelta(days=180))
+    undocking_id = "undocking"
+    containers[undocking_id] = Container(undocking_id, "Airlock", *UNDOCKING_SHAPE)
+    latencies = []
+    manifest = None
+    for _ in range(WASTE_REPEATS):
+        started = time.perf_counter()
+        _, _, manifest = create_waste_return_plan(undocking_id, WASTE_MAX_WEIGHT)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "plans": WASTE_REPEATS,
+        "returnItems": len(manifest["returnItems"]),
+        "totalWeight": manifest["totalWeight"],
+        "optimal": manifest["optimal"],
+        "latency": latency_summary(latencies)
+    }
+
+
+def bench_simulation():
+    used_ids = [item_id for item_id, item in items.items() if item.container_id][:SIMULATION_ITEMS_PER_DAY]
+    latencies = []
+    for _ in range(SIMULATION_REPEATS):
+        started = time.perf_counter()
+        simulate_days(SIMULATION_DAYS, items_used_per_day=used_ids)
+        latencies.append(time.perf_counter() - started)
+    total = sum(latencies)
+    return {
+        "runs": SIMULATION_REPEATS,
+        "daysPerRun": SIMULATION_DAYS,
+        "daysPerSecond": SIMULATION_REPEATS * SIMULATION_DAYS / total if total else 0.0,
+        "latency": latency_summary(latencies)
+    }
+
+
+def run_paths(scale, seed, trace=False):
+    """Run every path once on a fresh station, returning results by path name"""
+    container_count, item_count = SCALES[scale]
+    reset_station(container_count, seed)
+    manifest = make_manifest(item_count, seed)
+    rng = random.Random(seed)
+
+    paths = [
+        ("placement", lambda: bench_placement(manifest)),
+        ("search", lambda: bench_search(rng)),
+        ("waste", bench_waste),
+        ("simulation", bench_simulation)
+    ]
+    results = {}
+    for name, run in paths:
+        if trace:
+            tracemalloc.start()
+        results[name] = run()
+        if trace:
+            results[name] = {"peakMemoryBytes": tracemalloc.get_traced_memory()[1]}
+            tracemalloc.stop()
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run")
+    args = parser.parse_args(argv)
+
+    commit = current_commit()
+    results = run_paths(args.scale, args.seed)
+    if not args.no_memory:
+        for name, memory in run_paths(args.scale, args.seed, trace=True).items():
+            results[name].update(memory)
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "containers": SCALES[args.scale][0],
+        "items": SCALES[args.scale][1],
+        "placementBackend": config.PLACEMENT_BACKEND,
+        "placementWorkers": config.PLACEMENT_WORKERS,
+        "results": results
+    }
+    output = args.output or f"suite-{commit}-{args.scale}.json"
+    with open(output, "w") as result_file:
+        json.dump(report, result_file, indent=2)
+
+    for name, result in results.items():
+        latency = result["latency"]
+        memory = result.get("peakMemoryBytes")
+        print(
+            f"{name:<11} p50 {latency['p50Ms']:8.2f} ms  p99 {latency['p99Ms']:8.2f} ms"
+            + (f"  peak {memory / 2 ** 20:6.1f} MiB" if memory is not None else "")
+        )
+    placement = results["placement"]
+    print(
+        f"placed {placement['placed']}/{placement['items']} items at {placement['itemsPerSecond']:.0f}/s, "
+        f"utilization {placement['utilization']:.1%}"
+    )
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Locks that let request threads share the in-memory station.
+
+Every Container has a readers-writer lock. Searches hold read locks, so any
+number of them run at once, and changes to a container's items hold its
+write lock. Threads that lock several containers always take them in
+container id order, so they cannot deadlock. The ItemStore and the
+simulation clock have their own internal locks.
+
+The state lives in process memory, so a gunicorn deployment should run one
+worker process with several threads (``gunicorn -w 1 --threads 8 app:app``).
+"""
+import multiprocessing
+import threading
+from contextlib import contextmanager
+
+
+def in_worker_process():
+    """Check if this is a child process, such as a placement search worker.
+
+    Spawned children import the app's modules before
+    multiprocessing.parent_process() is set, so the process name is checked.
+    """
+    return multiprocessing.current_process().name != "MainProcess"
+
+
+class RWLock:
+    """Readers-writer lock that lets waiting writers in ahead of new readers"""
+
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if not self.readers:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.condition:
+            self.writer = False
+            self.condition.notify_all()
+
+
+def lock_order(containers):
+    """Get the distinct containers in the order their locks must be taken"""
+    unique = {container.container_id: container for container in containers}
+    return [unique[container_id] for container_id in sorted(unique, key=str)]
+
+
+@contextmanager
+def read_locked(containers):
+    """Hold read locks on several containers"""
+    held = []
+    try:
+        for container in lock_order(containers):
+            container.lock.acquire_read()
+            held.append(container)
+        yield
+    finally:
+        for container in reversed(held):
+            container.lock.release_read()
+
+
+@contextmanager
+def write_locked(containers):
+    """Hold write locks on several containers"""
+    held = []
+    try:
+        for container in lock_order(containers):
+            container.lock.acquire_write()
+            held.append(container)
+        yield
+    finally:
+        for container in reversed(held):
+            container.lock.release_write()
+
+
+# Searches hold only read locks on a container, so two of them may find a
+# structure built from its items out of date at the same time
+_refresh_lock = threading.Lock()
+
+
+def refreshed(container, attribute, create, suitable=None):
+    """Get a search structure kept on a container, brought up to date first.
+
+    The structure is made with create(container) when the container has none
+    (or suitable(structure) is false), and its refresh(container) is called
+    whenever its version differs from the container's.
+    """
+    with _refresh_lock:
+        structure = getattr(container, attribute, None)
+        if structure is None or (suitable is not None and not suitable(structure)):
+            structure = create(container)
+            setattr(container, attribute, structure)
+        if structure.version != container.version:
+            structure.refresh(container)
+    return structure
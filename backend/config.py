@@ -0,0 +1,83 @@
+import os
+
+# Placement search used by find_optimal_placement: "extreme_point", "occupancy"
+# or "heightmap" (items rest on the floor or on other items).
+# benchmarks/occupancy_grid.py measures the tradeoff: up to ~1000 items
+# "extreme_point" takes well under a millisecond per search while "occupancy"
+# at 1 cm resolution takes ~4 ms after a placement and ~0.4 s to build its grid
+# the first time or after a removal; at ~10000 items "occupancy" wins
+# (~3 ms at 5 cm, ~14 ms at 1 cm against ~40 ms)
+PLACEMENT_BACKEND = os.environ.get("CSMS_PLACEMENT_BACKEND", "extreme_point")
+
+# Edge length in cm of one cell of the occupancy grid backend
+OCCUPANCY_RESOLUTION = int(os.environ.get("CSMS_OCCUPANCY_RESOLUTION", "1"))
+
+# Share of an item's base that must rest on items below it with the heightmap backend
+MIN_SUPPORT_RATIO = float(os.environ.get("CSMS_MIN_SUPPORT_RATIO", "0.75"))
+
+# Worker processes for parallel placement search across containers (0 or 1 runs serially).
+# Each search ships the container's boxes to a worker, so this only pays off with
+# spare CPUs and many large, full containers whose fit searches take longer than
+# that transfer. Check with python -m benchmarks.parallel_placement first.
+PLACEMENT_WORKERS = int(os.environ.get("CSMS_PLACEMENT_WORKERS", "0"))
+
+# Threads running background placement jobs, and finished jobs kept for polling
+PLACEMENT_JOB_WORKERS = int(os.environ.get("CSMS_PLACEMENT_JOB_WORKERS", "2"))
+PLACEMENT_JOB_HISTORY = int(os.environ.get("CSMS_PLACEMENT_JOB_HISTORY", "100"))
+
+# Fit search results kept for reuse by later items of the same size (0 disables)
+PLACEMENT_CACHE_SIZE = int(os.environ.get("CSMS_PLACEMENT_CACHE_SIZE", "10000"))
+
+# Bounds on the rearrangement search run when an item does not fit anywhere
+REARRANGEMENT_MAX_MOVES = int(os.environ.get("CSMS_REARRANGEMENT_MAX_MOVES", "3"))
+REARRANGEMENT_CANDIDATES = int(os.environ.get("CSMS_REARRANGEMENT_CANDIDATES", "12"))
+REARRANGEMENT_NODE_BUDGET = int(os.environ.get("CSMS_REARRANGEMENT_NODE_BUDGET", "500"))
+REARRANGEMENT_TIME_BUDGET = float(os.environ.get("CSMS_REARRANGEMENT_TIME_BUDGET", "2.0"))
+
+# Seconds allowed for choosing and fitting the waste to return
+WASTE_PLAN_TIME_BUDGET = float(os.environ.get("CSMS_WASTE_PLAN_TIME_BUDGET", "2.0"))
+
+# Most days one simulation request may fast-forward (the usage arrays grow with days x items)
+SIMULATION_MAX_DAYS = int(os.environ.get("CSMS_SIMULATION_MAX_DAYS", "3650"))
+
+# Rows validated and inserted together by the streaming CSV import
+IMPORT_CHUNK_SIZE = int(os.environ.get("CSMS_IMPORT_CHUNK_SIZE", "5000"))
+
+# Validate import chunks with pandas when it is installed
+IMPORT_VECTORIZED = os.environ.get("CSMS_IMPORT_VECTORIZED", "1") == "1"
+
+# Row errors kept in an import response; later ones are only counted
+IMPORT_MAX_ERRORS = int(os.environ.get("CSMS_IMPORT_MAX_ERRORS", "1000"))
+
+# Action log: width of the time buckets used for date range queries
+LOG_BUCKET_SECONDS = int(os.environ.get("CSMS_LOG_BUCKET_SECONDS", "3600"))
+
+# Action log entries per segment and the directory full segments are spilled
+# to as memory-mapped files (empty keeps the whole log in memory)
+LOG_SEGMENT_SIZE = int(os.environ.get("CSMS_LOG_SEGMENT_SIZE", "100000"))
+LOG_SPILL_DIR = os.environ.get("CSMS_LOG_SPILL_DIR", "")
+
+# Append-only JSON Lines file the action log is written to in the background
+# and reloaded from at startup (empty keeps the log in memory only)
+LOG_FILE = os.environ.get("CSMS_LOG_FILE", "")
+
+# Background log writer: queue bound, entries per write, seconds between
+# flushes, and what to do when the queue is full ("block" or "drop")
+LOG_QUEUE_SIZE = int(os.environ.get("CSMS_LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.environ.get("CSMS_LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("CSMS_LOG_FLUSH_INTERVAL", "0.5"))
+LOG_OVERFLOW = os.environ.get("CSMS_LOG_OVERFLOW", "block")
+
+# SQLite file holding the journal and snapshots of the station (empty keeps
+# state in memory only) and the journal rows written between snapshots
+PERSIST_PATH = os.environ.get("CSMS_PERSIST_PATH", "")
+PERSIST_SNAPSHOT_INTERVAL = int(os.environ.get("CSMS_PERSIST_SNAPSHOT_INTERVAL", "1000"))
+
+# Collect the counters, timers and request latencies served at /api/metrics
+METRICS_ENABLED = os.environ.get("CSMS_METRICS_ENABLED", "1") == "1"
+
+# Fraction of requests run under cProfile (0 disables), the seconds above
+# which a profiled request is saved, and the directory profiles are saved to
+PROFILE_SAMPLE_RATE = float(os.environ.get("CSMS_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_SECONDS = float(os.environ.get("CSMS_PROFILE_SLOW_SECONDS", "1.0"))
+PROFILE_DIR = os.environ.get("CSMS_PROFILE_DIR", "profiles")
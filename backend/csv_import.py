@@ -0,0 +1,206 @@
+"""Streaming CSV import of items and containers.
+
+Uploads are decoded incrementally and processed in chunks of
+config.IMPORT_CHUNK_SIZE rows. Each chunk is validated (with pandas when it
+is available, row by row otherwise) and inserted in bulk, so memory use
+depends on the chunk size rather than on the size of the file.
+"""
+import csv
+import io
+from itertools import islice
+
+import config
+from models import items, containers, Container, Item
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# CSV column -> (Item argument, type, default when the column is missing)
+ITEM_COLUMNS = {
+    "Width (cm)": ("width", int, 0),
+    "Depth (cm)": ("depth", int, 0),
+    "Height (cm)": ("height", int, 0),
+    "Mass (kg)": ("mass", float, 0),
+    "Priority (1-100)": ("priority", int, 50),
+    "Usage Limit": ("usage_limit", int, 1),
+}
+
+CONTAINER_COLUMNS = {
+    "Width(cm)": ("width", int, 0),
+    "Depth(cm)": ("depth", int, 0),
+    "Height(height)": ("height", int, 0),
+}
+
+
+def read_chunks(stream, chunk_size=None):
+    """Decode an uploaded byte stream and yield (first row number, rows) chunks"""
+    chunk_size = chunk_size or config.IMPORT_CHUNK_SIZE
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        row_num = 2  # Start at 2 to account for header
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            yield row_num, chunk
+            row_num += len(chunk)
+    finally:
+        # Leave the upload stream open for the caller
+        text.detach()
+
+
+def parse_rows(chunk, first_row, id_column, columns, build):
+    """Validate a chunk row by row, returning (objects, errors)"""
+    objects = []
+    errors = []
+    for row_num, row in enumerate(chunk, start=first_row):
+        try:
+            object_id = row.get(id_column)
+            if not object_id:
+                errors.append({
+                    "row": row_num,
+                    "message": f"Missing {id_column}"
+                })
+                continue
+
+            values = {}
+            for column, (argument, kind, default) in columns.items():
+                value = row.get(column, default)
+                # Short rows leave their trailing cells as None
+                if value is None:
+                    raise ValueError(f"Missing {column}")
+                values[argument] = kind(value)
+            objects.append(build(object_id, row, values))
+
+        except Exception as e:
+            errors.append({
+                "row": row_num,
+                "message": str(e)
+            })
+    return objects, errors
+
+
+def parse_rows_vectorized(chunk, first_row, id_column, columns, build):
+    """Validate a chunk with pandas column operations, returning (objects, errors)"""
+    frame = pd.DataFrame.from_records(chunk)
+    frame.index = range(first_row, first_row + len(chunk))
+    messages = pd.Series("", index=frame.index)
+
+    ids = frame[id_column] if id_column in frame else pd.Series(None, index=frame.index, dtype=object)
+    missing = ids.isna() | (ids == "")
+    messages[missing] = f"Missing {id_column}"
+
+    parsed = {}
+    for column, (argument, kind, default) in columns.items():
+        if column not in frame:
+            parsed[argument] = pd.Series(default, index=frame.index)
+            continue
+        cells = frame[column]
+        # Short rows leave their trailing cells missing
+        absent = cells.isna() & (messages == "")
+        messages[absent] = f"Missing {column}"
+        numbers = pd.to_numeric(cells, errors="coerce")
+        invalid = numbers.isna()
+        if kind is int:
+            invalid |= numbers.notna() & (numbers % 1 != 0)
+        invalid &= messages == ""
+        messages[invalid] = "Invalid " + column + ": " + cells[invalid].map(str)
+        parsed[argument] = numbers
+
+    errors = [
+        {"row": int(row_num), "message": message}
+        for row_num, message in messages[messages != ""].items()
+    ]
+
+    valid = messages == ""
+    records = frame[valid].to_dict("records")
+    values_by_argument = {
+        argument: [kind(value) for value in parsed[argument][valid]]
+        for argument, kind, _ in columns.values()
+    }
+
+    # Values can still be rejected when the object is built, e.g. if out of range
+    row_nums = frame.index[valid]
+    objects = []
+    for position, row in enumerate(records):
+        values = {argument: column[position] for argument, column in values_by_argument.items()}
+        try:
+            objects.append(build(row[id_column], row, values))
+        except Exception as e:
+            errors.append({"row": int(row_nums[position]), "message": str(e)})
+    errors.sort(key=lambda error: error["row"])
+    return objects, errors
+
+
+def build_item(item_id, row, values):
+    return Item(
+        item_id=item_id,
+        name=row.get("Name", ""),
+        expiry_date=row.get("Expiry Date (ISO Format)", "N/A"),
+        preferred_zone=row.get("Preferred Zone", ""),
+        **values
+    )
+
+
+def build_container(container_id, row, values):
+    return Container(
+        container_id=container_id,
+        zone=row.get("Zone", ""),
+        **values
+    )
+
+
+def validate_chunk(chunk, first_row, id_column, columns, build):
+    """Validate a chunk with the fastest available parser"""
+    if pd is not None and config.IMPORT_VECTORIZED:
+        return parse_rows_vectorized(chunk, first_row, id_column, columns, build)
+    return parse_rows(chunk, first_row, id_column, columns, build)
+
+
+def import_item_chunks(stream, chunk_size=None):
+    """Import items from a CSV stream, yielding progress after every chunk.
+
+    Each progress dict has rowsProcessed, itemsImported and the errors and
+    imported items of that chunk.
+    """
+    rows_processed = 0
+    items_imported = 0
+    for first_row, chunk in read_chunks(stream, chunk_size):
+        new_items, errors = validate_chunk(chunk, first_row, "Item ID", ITEM_COLUMNS, build_item)
+        items.add_many(new_items)
+
+        rows_processed += len(chunk)
+        items_imported += len(new_items)
+        yield {
+            "rowsProcessed": rows_processed,
+            "itemsImported": items_imported,
+            "errors": errors,
+            "items": new_items
+        }
+
+
+def import_container_chunks(stream, chunk_size=None):
+    """Import containers from a CSV stream, yielding progress after every chunk.
+
+    Each progress dict has rowsProcessed, containersImported and the errors and
+    imported containers of that chunk.
+    """
+    rows_processed = 0
+    containers_imported = 0
+    for first_row, chunk in read_chunks(stream, chunk_size):
+        new_containers, errors = validate_chunk(
+            chunk, first_row, "Container ID", CONTAINER_COLUMNS, build_container
+        )
+        containers.update((container.container_id, container) for container in new_containers)
+
+        rows_processed += len(chunk)
+        containers_imported += len(new_containers)
+        yield {
+            "rowsProcessed": rows_processed,
+            "containersImported": containers_imported,
+            "errors": errors,
+            "containers": new_containers
+        }
@@ -0,0 +1,142 @@
+"""Heightmap representation of a container for gravity-aware placement.
+
+Each 1 cm column of the container floor records the height of the highest
+item top above it. A box placed with its corner at (x, y) drops straight
+down and rests on the highest point under its footprint, so every (x, y)
+has exactly one candidate z and the search is over the floor plan only.
+Nothing can be placed under an overhang.
+
+A resting position is accepted on the floor, or when at least
+CSMS_MIN_SUPPORT_RATIO of the footprint lies on item tops at the resting
+height, so placed items always form stable stacks.
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import config
+from concurrency import refreshed
+from instrumentation import timed, count
+
+# Depth rows whose candidate positions are checked for support together
+ROW_BLOCK = 8
+
+
+def window_max(values, size, axis):
+    """Get the maximum of every run of size values along an axis.
+
+    Maxima of runs of 1, 2, 4, ... values are built by doubling and the last
+    step overlaps two runs, so the work grows with log(size) rather than size.
+    """
+    values = np.moveaxis(values, axis, 0)
+    span = 1
+    while span * 2 <= size:
+        values = np.maximum(values[:-span], values[span:])
+        span *= 2
+    if span < size:
+        values = np.maximum(values[:-(size - span)], values[size - span:])
+    return np.moveaxis(values, 0, axis)
+
+
+class Heightmap:
+    """2D map of the top surface of one container's items"""
+
+    def __init__(self, container):
+        self.heights = np.zeros((int(container.width), int(container.depth)), dtype=np.int32)
+        self.boxes = {}  # item_id -> box, as painted into heights
+        self.version = None
+
+    def paint(self, box):
+        """Raise the columns under a box to its top"""
+        columns = self.heights[math.floor(box[0]):math.ceil(box[3]), math.floor(box[1]):math.ceil(box[4])]
+        np.maximum(columns, math.ceil(box[5]), out=columns)
+
+    def refresh(self, container):
+        """Bring the map up to date with the container's placed items.
+
+        Items only added since the last refresh are painted on top; any
+        removal or move means the map is repainted from scratch.
+        """
+        boxes = container.boxes
+        if len(boxes) < len(self.boxes) or any(boxes.get(item_id) != box for item_id, box in self.boxes.items()):
+            self.heights[:] = 0
+            self.boxes = {}
+        for item_id, box in boxes.items():
+            if item_id not in self.boxes:
+                self.paint(box)
+                self.boxes[item_id] = box
+        self.version = container.version
+
+    def resting_heights(self, width, depth, min_depth, max_depth):
+        """Get the height a box would rest at for every corner position.
+
+        The result has one row per x and one column per y from min_depth to
+        max_depth inclusive.
+        """
+        heights = self.heights[:, min_depth:max_depth + depth]
+        return window_max(window_max(heights, width, 0), depth, 1)
+
+    def supported_area(self, xs, ys, width, depth, rest):
+        """Get the footprint area lying at the resting height for each corner (x, y)"""
+        windows = sliding_window_view(self.heights, (width, depth))[xs, ys]
+        return np.count_nonzero(windows == rest[:, None, None], axis=(1, 2))
+
+
+def get_heightmap(container):
+    """Get the container's heightmap, refreshing it if the container changed"""
+    return refreshed(container, "heightmap", Heightmap)
+
+
+@timed
+def find_heightmap_fit(container, width, depth, height, stats=None, depth_limit=None, min_depth=0):
+    """Find the shallowest stable resting position for a box.
+
+    Within the shallowest depth that has one, the lowest resting position
+    is taken, then the one nearest the left wall.
+    """
+    max_x = int(container.width) - width
+    max_y = int(container.depth) - depth
+    max_z = container.height - height
+    if max_x < 0 or max_y < 0 or max_z < 0:
+        return None
+
+    if depth_limit is not None:
+        max_y = min(max_y, math.ceil(depth_limit) - 1)
+    min_depth = math.ceil(min_depth)
+    if max_y < min_depth:
+        return None
+
+    heightmap = get_heightmap(container)
+    rest = heightmap.resting_heights(width, depth, min_depth, max_y)
+    low_enough = rest <= max_z
+
+    evaluated = 0
+    corner = None
+    needed = config.MIN_SUPPORT_RATIO * width * depth
+    rows = np.flatnonzero(low_enough.any(axis=0))
+    for start in range(0, rows.size, ROW_BLOCK):
+        block = rows[start:start + ROW_BLOCK]
+        xs, columns = np.nonzero(low_enough[:, block])
+        ys = block[columns] + min_depth
+        levels = rest[xs, block[columns]]
+        evaluated += xs.size
+
+        # The floor supports the whole footprint
+        stable = levels == 0
+        raised = ~stable
+        if raised.any():
+            stable[raised] = heightmap.supported_area(
+                xs[raised], ys[raised], width, depth, levels[raised]
+            ) >= needed
+        if stable.any():
+            xs, ys, levels = xs[stable], ys[stable], levels[stable]
+            best = np.lexsort((xs, levels, ys))[0]
+            corner = int(xs[best]), int(ys[best]), int(levels[best])
+            break
+
+    if stats is not None:
+        stats["candidatesEvaluated"] = stats.get("candidatesEvaluated", 0) + evaluated
+    count("csms_candidates_evaluated_total", evaluated)
+
+    return corner
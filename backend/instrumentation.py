@@ -0,0 +1,243 @@
+"""Counters, timers and request latency histograms, served in Prometheus text format.
+
+``timed`` wraps a function so each call is recorded in the
+csms_function_seconds histogram, and ``count`` adds to a counter. Both do
+nothing when CSMS_METRICS_ENABLED is off; timed then returns the function
+unchanged, so disabled metrics cost nothing on the hot paths.
+
+``init_app`` adds Flask hooks that record the latency of every request by
+route, method and status. Streamed responses are timed until their first
+byte. With CSMS_PROFILE_SAMPLE_RATE set, that fraction of requests runs
+under cProfile (one at a time, since profilers cannot overlap) and requests
+slower than CSMS_PROFILE_SLOW_SECONDS are saved to CSMS_PROFILE_DIR as a
+.pstats file plus a text summary.
+"""
+import bisect
+import cProfile
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+
+from flask import g, request
+
+import config
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "csms_function_seconds": "Time spent in instrumented functions",
+    "csms_request_seconds": "Request latency by route",
+    "csms_candidates_evaluated_total": "Candidate positions evaluated by fit searches",
+    "csms_overlap_checks_total": "Placed items tested for overlap with a box",
+    "csms_containers_skipped_total": "Containers skipped by placement search without a fit search",
+    "csms_log_entries_total": "Action log entries written",
+    "csms_date_parses_total": "Dates parsed, by parser",
+    "csms_journal_records_total": "Journal rows written by persistence",
+    "csms_profiles_saved_total": "Slow request profiles saved"
+}
+
+
+class Histogram:
+    """Bucketed observations with their sum and count"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in pairs) + "}"
+
+
+def format_value(value):
+    if isinstance(value, float) and value == int(value) and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Thread-safe registry of labelled counters and histograms"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, sorted label pairs) -> value
+        self.histograms = {}  # (name, sorted label pairs) -> Histogram
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self, gauges=()):
+        """Get every metric in Prometheus text format.
+
+        gauges are extra (name, help, labels dict, value) samples read at
+        scrape time, such as queue depths.
+        """
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, (list(histogram.counts), histogram.sum, histogram.count))
+                for key, histogram in self.histograms.items()
+            )
+
+        lines = []
+        declared = set()
+
+        def declare(name, kind, help_text=None):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {help_text or HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        for (name, labels), (counts, total, count) in histograms:
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+        for name, help_text, labels, value in gauges:
+            declare(name, "gauge", help_text)
+            lines.append(f"{name}{format_labels(sorted(labels.items()))} {format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def count(name, amount=1, **labels):
+    """Add to a counter"""
+    if config.METRICS_ENABLED:
+        metrics.count(name, amount, **labels)
+
+
+def timed(function):
+    """Record the duration of every call in csms_function_seconds"""
+    if not config.METRICS_ENABLED:
+        return function
+    name = function.__qualname__
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        # Metrics turned off after import, as in placement search workers
+        if not config.METRICS_ENABLED:
+            return function(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            metrics.observe("csms_function_seconds", time.perf_counter() - started, function=name)
+
+    return wrapper
+
+
+# Only one profiler can be active in the process at a time
+_profile_lock = threading.Lock()
+
+
+def start_profiler():
+    """Start profiling the current request if no other request is being profiled"""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiling tool is active
+        _profile_lock.release()
+        return None
+    return profiler
+
+
+def stop_profiler(profiler, elapsed, route):
+    """Stop profiling and save the profile if the request was slow"""
+    profiler.disable()
+    _profile_lock.release()
+    if elapsed < config.PROFILE_SLOW_SECONDS:
+        return None
+
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", f"{request.method}-{route}").strip("-")
+    path = os.path.join(config.PROFILE_DIR, f"{datetime.now():%Y%m%dT%H%M%S%f}-{slug}")
+    profiler.dump_stats(path + ".pstats")
+    with open(path + ".txt", "w") as summary:
+        summary.write(f"{request.method} {request.full_path} took {elapsed:.3f}s\n\n")
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+    count("csms_profiles_saved_total")
+    return path
+
+
+def init_app(app):
+    """Record request latencies and profile sampled requests"""
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        if config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE:
+            g.profiler = start_profiler()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        if config.METRICS_ENABLED:
+            metrics.observe(
+                "csms_request_seconds", elapsed,
+                method=request.method, route=route, status=str(response.status_code)
+            )
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            stop_profiler(profiler, elapsed, route)
+        return response
+
+    @app.teardown_request
+    def release_profiler(error=None):
+        # Requests that raised never reached after_request
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
@@ -0,0 +1,170 @@
+"""Background jobs for long placements.
+
+A job runs on a small thread pool and reports each item's result as it is
+known, so clients can poll progress, read the placements made so far and an
+estimate of the time left, and cancel the job between items. Items placed
+before a cancellation stay placed.
+
+Jobs change the station through the same locked paths as requests
+(find_and_place, or a batch packed under write locks on every container),
+so concurrent jobs and requests never see half-made changes.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FAILED = "failed"
+FINISHED = (COMPLETED, CANCELLED, FAILED)
+
+
+class Job:
+    """State and results of one background job"""
+
+    def __init__(self, kind, total=None, discard=None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.total = total  # items to place, None until known
+        self.status = QUEUED
+        self.results = []  # per-item results in the order they were made
+        self.placed_count = 0
+        self.result = None  # final response, once finished
+        self.message = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.future = None
+        self.discard = discard  # cleanup run instead if the job is cancelled before it starts
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def record(self, result):
+        """Add an item's result: {itemId, containerId, position} or {itemId, reason}"""
+        with self.lock:
+            self.results.append(result)
+            if "containerId" in result:
+                self.placed_count += 1
+
+    def progress(self, since=0):
+        """Get the job's progress and the item results from index since on"""
+        with self.lock:
+            processed = len(self.results)
+            results = self.results[since:]
+            placed = self.placed_count
+
+        elapsed = None
+        eta = None
+        if self.started is not None:
+            elapsed = (self.finished or time.time()) - self.started
+            if self.status == RUNNING and self.total and processed:
+                eta = elapsed / processed * (self.total - processed)
+
+        return {
+            "jobId": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "processed": processed,
+            "placedCount": placed,
+            "unplacedCount": processed - placed,
+            "elapsedSeconds": elapsed,
+            "etaSeconds": eta,
+            "message": self.message,
+            "since": since,
+            "results": results
+        }
+
+
+class JobRunner:
+    """Thread pool running jobs, keeping the most recent ones for polling"""
+
+    def __init__(self, workers=2, history=100):
+        self.workers = workers
+        self.history = history
+        self.jobs = OrderedDict()  # job_id -> Job, oldest first
+        self.lock = threading.Lock()
+        self.pool = None
+
+    def submit(self, kind, run, total=None, discard=None):
+        """Queue run(job) as a new job and return the job.
+
+        run should call job.record for every item, stop between items once
+        job.cancelled is set, and return the final response (what was done so
+        far, if cancelled). If the job is cancelled while still queued, run is
+        never called and discard() is called instead, to release or persist
+        what the request set up for it.
+        """
+        job = Job(kind, total, discard)
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="placement-job")
+            self.jobs[job.job_id] = job
+            self._prune()
+            job.future = self.pool.submit(self._run, job, run)
+        return job
+
+    def _run(self, job, run):
+        job.started = time.time()
+        job.status = RUNNING
+        try:
+            job.result = run(job)
+            job.status = CANCELLED if job.cancelled else COMPLETED
+        except Exception as e:
+            job.message = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history size"""
+        excess = len(self.jobs) - self.history
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]:
+            if excess <= 0:
+                break
+            del self.jobs[job_id]
+            excess -= 1
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        """Ask a job to stop; a job still queued never starts. Returns the job or None"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.started = job.finished = time.time()
+            try:
+                if job.discard is not None:
+                    job.discard()
+            except Exception as e:
+                job.message = str(e)
+            job.status = CANCELLED
+        return job
+
+    def counts(self):
+        """Get the number of kept jobs in each status"""
+        counts = dict.fromkeys((QUEUED, RUNNING) + FINISHED, 0)
+        for job in self.list():
+            counts[job.status] += 1
+        return counts
+
+
+placement_jobs = JobRunner(config.PLACEMENT_JOB_WORKERS, config.PLACEMENT_JOB_HISTORY)
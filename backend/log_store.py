@@ -0,0 +1,325 @@
+"""Append-only, columnar store for the action log.
+
+Entries are numbered by a global sequence and stored column by column:
+integer timestamps (microseconds since the epoch) and interned action, user,
+item and container codes in compact arrays, with the details dicts kept
+alongside. Appending is O(1). Queries narrow the sequence range with a
+time-bucket index, walk the shortest matching per-item, per-user or
+per-action posting list, binary-search the others, and return pages
+addressed by a cursor (the sequence number to continue after).
+
+When a spill directory is configured, full segments are written to disk
+(a .npy column file plus a JSON Lines details file) and memory-mapped back,
+so only the newest segment and the indexes stay in memory.
+"""
+import bisect
+import json
+import mmap
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+SEGMENT_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("action", "<u4"),
+    ("user", "<u4"),
+    ("item", "<u4"),
+    ("container", "<u4"),
+    ("detailOffset", "<u8"),
+    ("detailLength", "<u4"),
+])
+
+
+class Interner:
+    """Two-way mapping between strings and small integer codes (0 is None)"""
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes = {}
+        self.values = [None]
+
+    def code(self, value):
+        if value is None:
+            return 0
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value):
+        """Get the code of a value that may never have been seen (-1 if so)"""
+        if value is None:
+            return 0
+        return self.codes.get(value, -1)
+
+
+class HotSegment:
+    """The newest entries, held in growable arrays"""
+    __slots__ = ("base", "timestamps", "actions", "users", "items", "containers", "details")
+
+    def __init__(self, base):
+        self.base = base
+        self.timestamps = array("q")
+        self.actions = array("I")
+        self.users = array("I")
+        self.items = array("I")
+        self.containers = array("I")
+        self.details = []
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def row(self, offset):
+        return (
+            self.timestamps[offset], self.actions[offset], self.users[offset],
+            self.items[offset], self.containers[offset], self.details[offset]
+        )
+
+    def timestamp(self, offset):
+        return self.timestamps[offset]
+
+
+class SpilledSegment:
+    """A full segment written to disk and memory-mapped back"""
+    __slots__ = ("base", "columns", "details_file", "details")
+
+    def __init__(self, base, columns_path, details_path):
+        self.base = base
+        self.columns = np.load(columns_path, mmap_mode="r")
+        self.details_file = open(details_path, "rb")
+        self.details = mmap.mmap(self.details_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def row(self, offset):
+        record = self.columns[offset]
+        start = int(record["detailOffset"])
+        details = json.loads(self.details[start:start + int(record["detailLength"])])
+        return (
+            int(record["timestamp"]), int(record["action"]), int(record["user"]),
+            int(record["item"]), int(record["container"]), details
+        )
+
+    def timestamp(self, offset):
+        return int(self.columns["timestamp"][offset])
+
+    def close(self):
+        self.details.close()
+        self.details_file.close()
+
+
+class LogStore:
+    """Columnar action log with time-bucket and per-field indexes"""
+
+    def __init__(self, bucket_seconds=3600, segment_size=100000, spill_dir=None):
+        self.bucket_size = int(bucket_seconds * 1_000_000)
+        self.segment_size = segment_size
+        self.spill_dir = spill_dir
+        self.actions = Interner()
+        self.users = Interner()
+        self.item_ids = Interner()
+        self.container_ids = Interner()
+        self.lock = threading.Lock()  # serializes appends from request threads
+        self.clear()
+
+    def clear(self):
+        """Drop every entry"""
+        for segment in getattr(self, "spilled", ()):
+            segment.close()
+        self.spilled = []
+        self.spilled_bases = []
+        self.hot = HotSegment(0)
+        self.count = 0
+        self.last_timestamp = 0
+        # Time buckets: bucket number -> sequence of its first entry
+        self.bucket_keys = []
+        self.bucket_starts = []
+        # Posting lists of sequence numbers, ascending
+        self.by_action = {}
+        self.by_user = {}
+        self.by_item = {}
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for sequence in range(self.count):
+            yield self.entry(sequence)
+
+    def append(self, action_type, user_id, item_id, container_id=None, details=None, timestamp=None):
+        """Record an entry and get its sequence number"""
+        with self.lock:
+            return self._append(action_type, user_id, item_id, container_id, details, timestamp)
+
+    def _append(self, action_type, user_id, item_id, container_id, details, timestamp):
+        if timestamp is None:
+            timestamp = time.time_ns() // 1000
+        # Keep the log ordered by time even if the wall clock steps back
+        timestamp = max(timestamp, self.last_timestamp)
+        self.last_timestamp = timestamp
+
+        sequence = self.count
+        bucket = timestamp // self.bucket_size
+        if not self.bucket_keys or self.bucket_keys[-1] != bucket:
+            self.bucket_keys.append(bucket)
+            self.bucket_starts.append(sequence)
+
+        action = self.actions.code(action_type)
+        user = self.users.code(user_id)
+        item = self.item_ids.code(item_id)
+
+        hot = self.hot
+        hot.timestamps.append(timestamp)
+        hot.actions.append(action)
+        hot.users.append(user)
+        hot.items.append(item)
+        hot.containers.append(self.container_ids.code(container_id))
+        hot.details.append(details or {})
+
+        self._post(self.by_action, action, sequence)
+        self._post(self.by_user, user, sequence)
+        if item:
+            self._post(self.by_item, item, sequence)
+
+        self.count += 1
+        if self.spill_dir and len(hot) >= self.segment_size:
+            self.spill()
+        return sequence
+
+    @staticmethod
+    def _post(index, code, sequence):
+        postings = index.get(code)
+        if postings is None:
+            postings = index[code] = array("I")
+        postings.append(sequence)
+
+    def spill(self):
+        """Write the hot segment to disk and memory-map it"""
+        hot = self.hot
+        if not len(hot):
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        columns_path = os.path.join(self.spill_dir, f"segment-{hot.base}.npy")
+        details_path = os.path.join(self.spill_dir, f"segment-{hot.base}.jsonl")
+
+        columns = np.empty(len(hot), dtype=SEGMENT_DTYPE)
+        columns["timestamp"] = hot.timestamps
+        columns["action"] = hot.actions
+        columns["user"] = hot.users
+        columns["item"] = hot.items
+        columns["container"] = hot.containers
+
+        offsets = []
+        lengths = []
+        offset = 0
+        with open(details_path, "wb") as details_file:
+            for details in hot.details:
+                encoded = json.dumps(details).encode()
+                details_file.write(encoded + b"\n")
+                offsets.append(offset)
+                lengths.append(len(encoded))
+                offset += len(encoded) + 1
+        columns["detailOffset"] = offsets
+        columns["detailLength"] = lengths
+        np.save(columns_path, columns)
+
+        self.spilled.append(SpilledSegment(hot.base, columns_path, details_path))
+        self.spilled_bases.append(hot.base)
+        self.hot = HotSegment(self.count)
+
+    def _segment(self, sequence):
+        """Get the segment holding an entry and the entry's offset in it"""
+        if sequence >= self.hot.base:
+            return self.hot, sequence - self.hot.base
+        segment = self.spilled[bisect.bisect_right(self.spilled_bases, sequence) - 1]
+        return segment, sequence - segment.base
+
+    def timestamp(self, sequence):
+        segment, offset = self._segment(sequence)
+        return segment.timestamp(offset)
+
+    def entry(self, sequence):
+        """Get an entry in the API's dict form"""
+        segment, offset = self._segment(sequence)
+        timestamp, action, user, item, container, details = segment.row(offset)
+        return {
+            "logId": sequence,
+            "timestamp": datetime.fromtimestamp(timestamp / 1_000_000).isoformat(),
+            "actionType": self.actions.values[action],
+            "userId": self.users.values[user],
+            "itemId": self.item_ids.values[item],
+            "containerId": self.container_ids.values[container],
+            "details": details
+        }
+
+    @staticmethod
+    def _contains(postings, sequence):
+        index = bisect.bisect_left(postings, sequence)
+        return index < len(postings) and postings[index] == sequence
+
+    def time_bound(self, moment):
+        """Get the sequence of the first entry at or after a timestamp"""
+        bucket = moment // self.bucket_size
+        index = bisect.bisect_left(self.bucket_keys, bucket)
+        if index == len(self.bucket_keys):
+            return self.count
+        lo = self.bucket_starts[index]
+        if self.bucket_keys[index] != bucket:
+            return lo
+        hi = self.bucket_starts[index + 1] if index + 1 < len(self.bucket_starts) else self.count
+        return bisect.bisect_left(range(lo, hi), moment, key=self.timestamp) + lo
+
+    def query(self, start=None, end=None, item_id=None, user_id=None, action_type=None,
+              cursor=None, limit=None):
+        """Get matching entries in time order and the cursor for the next page.
+
+        start and end are datetimes (end is exclusive); cursor is the logId
+        of the last entry already read. The cursor is None on the last page.
+        """
+        lo = self.time_bound(int(start.timestamp() * 1_000_000)) if start else 0
+        hi = self.time_bound(int(end.timestamp() * 1_000_000)) if end else self.count
+        if cursor is not None:
+            lo = max(lo, int(cursor) + 1)
+
+        filters = []
+        for index, interner, value in (
+            (self.by_item, self.item_ids, item_id),
+            (self.by_user, self.users, user_id),
+            (self.by_action, self.actions, action_type),
+        ):
+            if value is None:
+                continue
+            code = interner.lookup(value)
+            if code < 0:
+                return [], None
+            filters.append(index.get(code, array("I")))
+
+        if filters:
+            # Walk the shortest posting list and check membership in the others
+            filters.sort(key=len)
+            postings = filters[0]
+            candidates = postings[bisect.bisect_left(postings, lo):bisect.bisect_left(postings, hi)]
+            others = filters[1:]
+            if others:
+                # Stop filtering once one entry past the page has been found
+                matches = (
+                    sequence for sequence in candidates
+                    if all(self._contains(other, sequence) for other in others)
+                )
+                candidates = list(islice(matches, None if limit is None else limit + 1))
+        else:
+            candidates = range(lo, hi)
+
+        next_cursor = None
+        if limit is not None and len(candidates) > limit:
+            candidates = candidates[:limit]
+            next_cursor = candidates[-1]
+        return [self.entry(sequence) for sequence in candidates], next_cursor
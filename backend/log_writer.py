@@ -0,0 +1,146 @@
+"""Background writer that appends action log entries to a JSON Lines file.
+
+Request handlers only put a tuple on a bounded queue; a daemon thread takes
+entries off in batches and writes each batch with a single append and flush.
+When the queue is full the request either waits for room ("block") or the
+entry is dropped from the file ("drop"). Either way it is counted in the
+backpressure metrics. The in-memory LogStore is updated synchronously, so
+queries always see every entry.
+"""
+import atexit
+import json
+import queue
+import threading
+import time
+
+FIELDS = ("timestamp", "actionType", "userId", "itemId", "containerId", "details")
+
+
+class LogWriter:
+    """Bounded queue drained to an append-only JSON Lines file"""
+
+    def __init__(self, path, queue_size=10000, batch_size=500, flush_interval=0.5, overflow="block"):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()  # guards the metrics
+        self.metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "blocked": 0,
+            "batches": 0,
+            "maxQueueDepth": 0,
+            "lastFlushSeconds": 0.0,
+            "writeErrors": 0
+        }
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the background thread and flush the queue at exit"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+
+    def submit(self, entry):
+        """Queue an entry tuple (timestamp, action, user, item, container, details)"""
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            if self.overflow == "drop":
+                with self.lock:
+                    self.metrics["dropped"] += 1
+                return False
+            with self.lock:
+                self.metrics["blocked"] += 1
+            self.queue.put(entry)
+
+        with self.lock:
+            self.metrics["enqueued"] += 1
+            depth = self.queue.qsize()
+            if depth > self.metrics["maxQueueDepth"]:
+                self.metrics["maxQueueDepth"] = depth
+        return True
+
+    def _take_batch(self, timeout):
+        """Wait for an entry, then take everything queued up to the batch size"""
+        try:
+            batch = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        lines = "".join(
+            json.dumps(dict(zip(FIELDS, entry)), separators=(",", ":")) + "\n"
+            for entry in batch
+        )
+        try:
+            with open(self.path, "a", encoding="utf-8") as log_file:
+                log_file.write(lines)
+        except OSError:
+            with self.lock:
+                self.metrics["writeErrors"] += 1
+            return
+        with self.lock:
+            self.metrics["written"] += len(batch)
+            self.metrics["batches"] += 1
+            self.metrics["lastFlushSeconds"] = time.perf_counter() - started
+
+    def _run(self):
+        while not self.stopping.is_set():
+            batch = self._take_batch(self.flush_interval)
+            if batch:
+                self._write(batch)
+        # Drain what is left after close()
+        while True:
+            batch = self._take_batch(0)
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self):
+        """Stop the thread after writing every queued entry"""
+        if self.thread is not None and self.thread.is_alive():
+            self.stopping.set()
+            self.thread.join()
+
+    def stats(self):
+        """Get the backpressure metrics"""
+        with self.lock:
+            stats = dict(self.metrics)
+        stats["queueDepth"] = self.queue.qsize()
+        stats["queueSize"] = self.queue.maxsize
+        return stats
+
+
+def replay(path, store):
+    """Load the entries of a log file into a LogStore, returning how many were read"""
+    count = 0
+    try:
+        log_file = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return 0
+    with log_file:
+        for line in log_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn last line from a crash
+                continue
+            store.append(
+                record["actionType"], record["userId"], record["itemId"],
+                record["containerId"], record["details"], timestamp=record["timestamp"]
+            )
+            count += 1
+    return count
@@ -1,22 +1,112 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from contextlib import nullcontext
+from functools import wraps
+from array import array
+import bisect
+import math
+import threading
+import time
+import difflib
+import itertools
 import json
-import uuid
 from dateutil import parser
+import config
+from concurrency import RWLock, in_worker_process
+from instrumentation import timed, count
+from spatial_index import DEFAULT_INDEX
+from log_store import LogStore
+from log_writer import LogWriter, replay
 
-# In-memory database
+# In-memory database (items is an ItemStore, created below the Item class)
 containers = {}
-items = {}
-logs = []
-current_date = datetime.now().isoformat()
+logs = LogStore(
+    bucket_seconds=config.LOG_BUCKET_SECONDS,
+    segment_size=config.LOG_SEGMENT_SIZE,
+    spill_dir=config.LOG_SPILL_DIR or None
+)
+log_writer = None
+
+# Container versions are unique across containers and their scratch copies
+next_version = itertools.count(1).__next__
+
+
+def to_box(start, end):
+    """Get the (x0, y0, z0, x1, y1, z1) box of a pair of coordinate dicts"""
+    return (start["width"], start["depth"], start["height"], end["width"], end["depth"], end["height"])
+
+
+def box_volume(box):
+    return (box[3] - box[0]) * (box[4] - box[1]) * (box[5] - box[2])
+
+
+def box_coordinates(box):
+    """Get the start and end coordinate dicts of a box"""
+    return (
+        {"width": box[0], "depth": box[1], "height": box[2]},
+        {"width": box[3], "depth": box[4], "height": box[5]}
+    )
+
+
+def box_position(box):
+    """Get a box in the API's startCoordinates/endCoordinates form"""
+    start, end = box_coordinates(box)
+    return {"startCoordinates": start, "endCoordinates": end}
 
 class Container:
-    def __init__(self, container_id, zone, width, depth, height):
+    def __init__(self, container_id, zone, width, depth, height, index=None):
         self.container_id = container_id
         self.zone = zone
         self.width = width
         self.depth = depth
         self.height = height
-        self.occupied_spaces = []  # List of (item_id, start_coords, end_coords)
+        self.index = index if index is not None else DEFAULT_INDEX()
+        self.boxes = {}  # item_id -> (x0, y0, z0, x1, y1, z1), in placement order
+        self.placement_order = {}  # item_id -> sequence number of its placement
+        self.placement_counter = 0
+        self.version = next_version()  # changes on every change to the placed items
+        self.occupancy = None  # optional OccupancyGrid, built on demand
+        self.heightmap = None  # optional Heightmap, built on demand
+        self.blockers = {}  # item_id -> ids of items directly in front of it
+        self.blocked = {}  # item_id -> ids of items it is directly in front of
+        self.unlinked = {}  # restored item ids not yet linked into the blocking graph
+        self.lock = RWLock()  # read for searches, write for changes to the placed items
+        self.graph_lock = threading.Lock()  # lets readers link restored items safely
+    
+    @property
+    def occupied_spaces(self):
+        """List of (item_id, box)"""
+        return list(self.boxes.items())
+    
+    @occupied_spaces.setter
+    def occupied_spaces(self, spaces):
+        self.boxes = {}
+        self.placement_order = {}
+        self.blockers = {}
+        self.blocked = {}
+        self.unlinked = {}
+        self.index.clear()
+        for item_id, box in spaces:
+            self._insert(item_id, box)
+        self.version = next_version()
+    
+    def copy(self):
+        """Get a scratch copy of the container with the same placed items"""
+        clone = Container(self.container_id, self.zone, self.width, self.depth, self.height, index=type(self.index)())
+        clone.occupied_spaces = self.occupied_spaces
+        return clone
+    
+    def sync_boxes(self, boxes, version):
+        """Make a search copy's placed items match boxes (item_id -> box) at a version.
+
+        Only items that changed are updated, and they are left out of the
+        blocking graph, which fit searches do not use.
+        """
+        for item_id in [item_id for item_id, box in self.boxes.items() if boxes.get(item_id) != box]:
+            self._delete(item_id)
+        for item_id, box in boxes.items():
+            if item_id not in self.boxes:
+                self._insert(item_id, box, link=False)
+        self.version = version
     
     def to_dict(self):
         return {
@@ -27,69 +117,307 @@ class Container:
             "height": self.height
         }
     
+    @timed
+    def get_boxes_overlapping(self, box, exclude=None):
+        """Get (item_id, box) for items overlapping a box"""
+        x0, y0, z0, x1, y1, z1 = box
+        overlapping = []
+        candidates = self.index.candidates(box)
+        count("csms_overlap_checks_total", len(candidates))
+        for item_id in candidates:
+            if item_id == exclude:
+                continue
+            other = self.boxes[item_id]
+            if not (x1 <= other[0] or x0 >= other[3] or
+                    y1 <= other[1] or y0 >= other[4] or
+                    z1 <= other[2] or z0 >= other[5]):
+                overlapping.append((item_id, other))
+        return overlapping
+    
     def is_space_available(self, start_coords, end_coords):
         """Check if the space is available for placement"""
-        for item_id, item_start, item_end in self.occupied_spaces:
-            # Check for overlap
-            if not (end_coords["width"] <= item_start["width"] or 
-                    start_coords["width"] >= item_end["width"] or
-                    end_coords["depth"] <= item_start["depth"] or
-                    start_coords["depth"] >= item_end["depth"] or
-                    end_coords["height"] <= item_start["height"] or
-                    start_coords["height"] >= item_end["height"]):
-                return False
-        return True
+        return not self.get_boxes_overlapping(to_box(start_coords, end_coords))
+    
+    @staticmethod
+    def _is_in_front(front, back):
+        """Check if one item lies in the retrieval path of another.
+
+        The footprints must overlap on width and height; items that only
+        touch side by side do not block each other.
+        """
+        return (front[0] < back[3] and front[3] > back[0] and
+                front[2] < back[5] and front[5] > back[2] and
+                front[1] < back[1])
+    
+    def _insert(self, item_id, box, link=True):
+        """Record a placed item and link it into the blocking graph (now or on first use)"""
+        self.boxes[item_id] = box
+        self.placement_order[item_id] = self.placement_counter
+        self.placement_counter += 1
+        self.index.insert(item_id, box)
+        
+        if link:
+            self._link(item_id)
+        else:
+            self.unlinked[item_id] = None
+    
+    def _link(self, item_id):
+        """Add an item's edges to the blocking graph"""
+        box = self.boxes[item_id]
+        blockers = self.blockers.setdefault(item_id, set())
+        blocked = self.blocked.setdefault(item_id, set())
+        
+        # The item's footprint from the open face to the back wall
+        region = (box[0], 0, box[2], box[3], self.depth, box[5])
+        for other_id in self.index.candidates(region):
+            if other_id == item_id:
+                continue
+            other = self.boxes[other_id]
+            # Unlinked neighbours get their sets early; linking them later re-adds the same edges
+            if self._is_in_front(other, box):
+                blockers.add(other_id)
+                self.blocked.setdefault(other_id, set()).add(item_id)
+            elif self._is_in_front(box, other):
+                blocked.add(other_id)
+                self.blockers.setdefault(other_id, set()).add(item_id)
     
+    @timed
+    def _link_pending(self):
+        """Link every restored item into the blocking graph"""
+        if self.unlinked:
+            with self.graph_lock:
+                for item_id in self.unlinked:
+                    self._link(item_id)
+                self.unlinked = {}
+    
+    def _delete(self, item_id):
+        """Forget a placed item and unlink it from the blocking graph"""
+        del self.boxes[item_id]
+        del self.placement_order[item_id]
+        self.index.remove(item_id)
+        self.unlinked.pop(item_id, None)
+        for other_id in self.blockers.pop(item_id, ()):
+            self.blocked[other_id].discard(item_id)
+        for other_id in self.blocked.pop(item_id, ()):
+            self.blockers[other_id].discard(item_id)
+    
+    @timed
     def add_item(self, item_id, start_coords, end_coords):
         """Add an item to the container"""
-        if self.is_space_available(start_coords, end_coords):
-            self.occupied_spaces.append((item_id, start_coords, end_coords))
+        box = to_box(start_coords, end_coords)
+        if not self.get_boxes_overlapping(box):
+            # Re-adding an item moves it rather than duplicating it
+            if item_id in self.boxes:
+                self._delete(item_id)
+            self._insert(item_id, box)
+            self.version = next_version()
             return True
         return False
     
+    def restore_item(self, item_id, start_coords, end_coords):
+        """Add an item at a position known to be free, skipping the overlap check.
+
+        The blocking graph is only updated when it is next needed, so restoring
+        a whole station stays fast.
+        """
+        if item_id in self.boxes:
+            self._delete(item_id)
+        self._insert(item_id, to_box(start_coords, end_coords), link=False)
+        self.version = next_version()
+    
+    @timed
     def remove_item(self, item_id):
         """Remove an item from the container"""
-        for i, (id, start, end) in enumerate(self.occupied_spaces):
-            if id == item_id:
-                self.occupied_spaces.pop(i)
-                return True
-        return False
+        if item_id not in self.boxes:
+            return False
+        self._delete(item_id)
+        self.version = next_version()
+        return True
     
     def get_item_position(self, item_id):
         """Get the position of an item in the container"""
-        for id, start, end in self.occupied_spaces:
-            if id == item_id:
-                return {
-                    "startCoordinates": start,
-                    "endCoordinates": end
-                }
-        return None
+        if item_id not in self.boxes:
+            return None
+        return box_position(self.boxes[item_id])
     
+    def get_direct_blockers(self, item_id):
+        """Get items directly in front of an item"""
+        self._link_pending()
+        return set(self.blockers.get(item_id, ()))
+    
+    @timed
     def get_items_blocking(self, item_id):
-        """Get items blocking the retrieval path of an item"""
-        target_position = self.get_item_position(item_id)
-        if not target_position:
+        """Get items blocking the retrieval path of an item, including items
+        blocking those, in the order they have to be removed"""
+        if item_id not in self.boxes:
             return []
+        self._link_pending()
         
-        start = target_position["startCoordinates"]
-        end = target_position["endCoordinates"]
+        blocking = set()
+        pending = list(self.blockers[item_id])
+        while pending:
+            blocker_id = pending.pop()
+            if blocker_id not in blocking:
+                blocking.add(blocker_id)
+                pending.extend(self.blockers[blocker_id])
         
-        blocking_items = []
-        for id, item_start, item_end in self.occupied_spaces:
-            if id == item_id:
-                continue
-                
-            # Check if item is in front of target item (closer to open face)
-            if (item_start["width"] <= end["width"] and item_end["width"] >= start["width"] and
-                item_start["height"] <= end["height"] and item_end["height"] >= start["height"] and
-                item_start["depth"] < start["depth"]):
-                blocking_items.append(id)
-                
-        return blocking_items
+        # Every blocker starts nearer the open face than the items it blocks,
+        # so front-to-back order removes each one before anything behind it
+        return sorted(
+            blocking,
+            key=lambda id: (self.boxes[id][1], self.placement_order[id])
+        )
+
+
+def parse_date(value):
+    """Parse an ISO date into a naive datetime, or None if it is missing or invalid.
+
+    Raises ValueError for values that are not strings, such as a JSON number.
+    """
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        if not isinstance(value, str):
+            raise ValueError(f"{value!r} is not a date")
+        if not value or value == "N/A":
+            return None
+        try:
+            value = datetime.fromisoformat(value)
+            count("csms_date_parses_total", parser="iso")
+        except ValueError:
+            count("csms_date_parses_total", parser="dateutil")
+            try:
+                value = parser.parse(value)
+            except (ValueError, OverflowError):
+                return None
+    
+    # Keep every date comparable with the naive simulation clock
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+EPOCH = datetime(1970, 1, 1)
+NO_EXPIRY = 2 ** 63 - 1  # sorts after every real expiry
+MISSING_INT = -2 ** 31  # stands for None in the integer columns
+
+
+def to_micros(value):
+    """Get a naive datetime as microseconds since the epoch"""
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+class ItemColumns:
+    """Struct-of-arrays storage for the numeric fields of every Item.
+
+    Each item owns one row of the arrays for as long as it exists, and the
+    rows of deleted items are reused. Dimensions, priority and uses are whole
+    numbers, as in the CSV import.
+    """
+    
+    def __init__(self):
+        self.width = array("i")
+        self.depth = array("i")
+        self.height = array("i")
+        self.priority = array("i")
+        self.uses = array("i")
+        self.mass = array("d")
+        self.expiry = array("q")  # microseconds since the epoch, or NO_EXPIRY
+        self.columns = (self.width, self.depth, self.height, self.priority, self.uses, self.mass, self.expiry)
+        self.free = []  # rows of deleted items
+        self.lock = threading.Lock()
+    
+    def allocate(self):
+        """Get an unused row"""
+        try:
+            return self.free.pop()
+        except IndexError:
+            pass
+        with self.lock:
+            for values in self.columns:
+                values.append(0)
+            return len(self.width) - 1
+    
+    def release(self, row):
+        self.free.append(row)
+    
+    def __len__(self):
+        return len(self.width) - len(self.free)
+
+
+def whole(value):
+    """Check a dimension, priority or use count for an integer column.
+
+    Raises ValueError for values that are not whole numbers or do not fit
+    in 32 bits.
+    """
+    if value is None:
+        return MISSING_INT
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{value!r} is not a whole number") from None
+    if number != value:
+        raise ValueError(f"{value!r} is not a whole number")
+    if not MISSING_INT < number < 2 ** 31:
+        raise ValueError(f"{value!r} is out of range")
+    return number
+
+
+def real(value):
+    """Check a mass for a float column; numeric strings are accepted.
+
+    Raises ValueError for values that are not numbers.
+    """
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{value!r} is not a number") from None
+
+
+def int_column(values):
+    """Property holding an item's value in an integer column"""
+    def get(self):
+        value = values[self.row]
+        return None if value == MISSING_INT else value
+    
+    def set(self, value):
+        values[self.row] = whole(value)
+    
+    return property(get, set)
+
+
+def float_column(values):
+    """Property holding an item's value in a float column"""
+    def get(self):
+        value = values[self.row]
+        return None if math.isnan(value) else value
+    
+    def set(self, value):
+        values[self.row] = real(value)
+    
+    return property(get, set)
+
+
+item_columns = ItemColumns()
 
 
 class Item:
+    """An item; its numeric fields live in item_columns and its position is an integer box"""
+    
+    __slots__ = ("row", "item_id", "name", "expiry_date", "usage_limit", "preferred_zone", "container_id", "box", "store")
+    
+    width = int_column(item_columns.width)
+    depth = int_column(item_columns.depth)
+    height = int_column(item_columns.height)
+    priority = int_column(item_columns.priority)
+    uses_remaining = int_column(item_columns.uses)
+    mass = float_column(item_columns.mass)
+    
     def __init__(self, item_id, name, width, depth, height, mass, priority, expiry_date, usage_limit, preferred_zone):
+        self.row = item_columns.allocate()
         self.item_id = item_id
         self.name = name
         self.width = width
@@ -98,11 +426,37 @@ class Item:
         self.mass = mass
         self.priority = priority
         self.expiry_date = expiry_date  # ISO format string or None
+        expiry = parse_date(expiry_date)  # parsed once
+        item_columns.expiry[self.row] = NO_EXPIRY if expiry is None else to_micros(expiry)
         self.usage_limit = usage_limit
         self.preferred_zone = preferred_zone
         self.uses_remaining = usage_limit
         self.container_id = None
-        self.position = None
+        self.box = None  # (x0, y0, z0, x1, y1, z1) in its container, or None
+        self.store = None  # ItemStore holding this item, kept informed of changes
+    
+    def __del__(self):
+        try:
+            item_columns.release(self.row)
+        except (AttributeError, TypeError):
+            # Construction failed before a row was taken, or the interpreter is exiting
+            pass
+    
+    @property
+    def expiry_micros(self):
+        """Expiry as microseconds since the epoch, NO_EXPIRY if there is none"""
+        return item_columns.expiry[self.row]
+    
+    @property
+    def expiry(self):
+        """Expiry as a naive datetime, None if there is none"""
+        micros = item_columns.expiry[self.row]
+        return None if micros == NO_EXPIRY else EPOCH + timedelta(microseconds=micros)
+    
+    @property
+    def position(self):
+        """Position in the API's startCoordinates/endCoordinates form, or None"""
+        return None if self.box is None else box_position(self.box)
     
     def to_dict(self):
         return {
@@ -121,47 +475,323 @@ class Item:
             "position": self.position
         }
     
+    def _store_lock(self):
+        """Get the lock that serializes updates to this item"""
+        return self.store.lock if self.store is not None else nullcontext()
+    
     def use_item(self):
         """Decrement the usage count when item is used"""
-        if self.uses_remaining > 0:
-            self.uses_remaining -= 1
-            return True
-        return False
+        with self._store_lock():
+            if self.uses_remaining > 0:
+                self.uses_remaining -= 1
+                if self.uses_remaining <= 0 and self.store is not None:
+                    self.store.reindex_uses(self)
+                return True
+            return False
+    
+    def consume(self, count):
+        """Use the item up to count times, stopping when it runs out"""
+        with self._store_lock():
+            used = min(count, max(self.uses_remaining, 0))
+            if used > 0:
+                self.uses_remaining -= used
+                if self.uses_remaining <= 0 and self.store is not None:
+                    self.store.reindex_uses(self)
+            return used
     
-    def is_waste(self, current_date_str):
+    def is_expired(self, current_date):
+        """Check if the item is past its expiry date (current_date is a datetime or ISO string)"""
+        expiry = self.expiry_micros
+        return expiry != NO_EXPIRY and to_micros(parse_date(current_date)) > expiry
+    
+    def is_waste(self, current_date):
         """Check if the item is waste (expired or out of uses)"""
         # Check if out of uses
         if self.uses_remaining <= 0:
             return True, "Out of Uses"
         
         # Check if expired
-        if self.expiry_date and self.expiry_date != "N/A":
-            current_date = parser.parse(current_date_str)
-            expiry_date = parser.parse(self.expiry_date)
-            if current_date > expiry_date:
-                return True, "Expired"
+        if self.is_expired(current_date):
+            return True, "Expired"
         
         return False, ""
     
     def set_position(self, container_id, position):
-        """Set the position of the item in a container"""
-        self.container_id = container_id
-        self.position = position
+        """Set the position of the item in a container (a position dict, or None)"""
+        with self._store_lock():
+            old_container_id = self.container_id
+            self.container_id = container_id
+            self.box = None if position is None else to_box(position["startCoordinates"], position["endCoordinates"])
+            if self.store is not None and old_container_id != container_id:
+                self.store.reindex_container(self, old_container_id)
+
+
+class SimulationClock:
+    """The simulation date, shared by every module and request thread"""
+    
+    def __init__(self, value=None):
+        self.lock = threading.RLock()
+        self.value = value or datetime.now().isoformat()
+    
+    def get(self):
+        """Get the current date as an ISO string"""
+        return self.value
+    
+    def now(self):
+        """Get the current date as a datetime"""
+        return parse_date(self.value)
+    
+    def set(self, value):
+        """Set the current date from a datetime or ISO string"""
+        with self.lock:
+            self.value = value.isoformat() if isinstance(value, datetime) else value
+    
+    def advance(self, days):
+        """Move the date forward, returning the old and new dates as datetimes"""
+        with self.lock:
+            start = self.now()
+            end = start + timedelta(days=days)
+            self.value = end.isoformat()
+            return start, end
+
+
+def normalize_name(name):
+    """Normalize an item name for lookups"""
+    return " ".join((name or "").split()).casefold()
+
+
+def synchronized(method):
+    """Run an ItemStore method while holding the store's lock"""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class ItemStore(dict):
+    """Dict of item_id -> Item that keeps secondary indexes consistent.
+
+    Index buckets are dicts used as insertion-ordered sets, so lookups return
+    items in the order they were stored, like a scan of the dict would.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.by_name = {}  # normalized name -> {item_id: None}
+        self.names = []  # sorted distinct normalized names, for prefix search
+        self.by_container = {}  # container_id -> {item_id: None}
+        self.by_zone = {}  # preferred zone -> {item_id: None}
+        self.expiry = []  # sorted (expiry in microseconds, item_id), soonest first
+        self.expiry_keys = {}  # item_id -> its entry in expiry
+        self.out_of_uses = {}  # {item_id: None} for items with no uses left
+        self.sequence = {}  # item_id -> insertion number, for stable ordering
+        self.counter = 0
+        self.lock = threading.RLock()  # guards the dict, the indexes and item updates
+    
+    @synchronized
+    def __setitem__(self, item_id, item):
+        if item_id in self:
+            self._unindex(item_id)
+        super().__setitem__(item_id, item)
+        self._index(item_id, item)
+    
+    @synchronized
+    def __delitem__(self, item_id):
+        self._unindex(item_id)
+        super().__delitem__(item_id)
+    
+    @synchronized
+    def pop(self, item_id, *default):
+        if item_id in self:
+            self._unindex(item_id)
+        return super().pop(item_id, *default)
+    
+    @synchronized
+    def clear(self):
+        for item in self.values():
+            item.store = None
+        super().clear()
+        self.__init__()
+    
+    @synchronized
+    def update(self, *args, **kwargs):
+        for item_id, item in dict(*args, **kwargs).items():
+            self[item_id] = item
+    
+    @synchronized
+    def add_many(self, new_items):
+        """Insert many items, merging them into the sorted indexes once"""
+        pending_names = []
+        pending_expiry = []
+        
+        # The last row wins when an id repeats, as with item-by-item inserts
+        latest = {item.item_id: item for item in new_items}
+        for item in latest.values():
+            if item.item_id in self:
+                self._unindex(item.item_id)
+            super().__setitem__(item.item_id, item)
+            self._index(item.item_id, item, pending_names, pending_expiry)
+        
+        if pending_names:
+            self.names.extend(pending_names)
+            self.names.sort()
+        if pending_expiry:
+            self.expiry.extend(pending_expiry)
+            self.expiry.sort()
+    
+    def _index(self, item_id, item, pending_names=None, pending_expiry=None):
+        item.store = self
+        self.sequence[item_id] = self.counter
+        self.counter += 1
+        
+        name = normalize_name(item.name)
+        if name not in self.by_name:
+            self.by_name[name] = {}
+            if pending_names is not None:
+                pending_names.append(name)
+            else:
+                bisect.insort(self.names, name)
+        self.by_name[name][item_id] = None
+        
+        if item.container_id:
+            self.by_container.setdefault(item.container_id, {})[item_id] = None
+        self.by_zone.setdefault(item.preferred_zone, {})[item_id] = None
+        
+        if item.expiry_micros != NO_EXPIRY:
+            key = (item.expiry_micros, item_id)
+            if pending_expiry is not None:
+                pending_expiry.append(key)
+            else:
+                bisect.insort(self.expiry, key)
+            self.expiry_keys[item_id] = key
+        
+        if item.uses_remaining is not None and item.uses_remaining <= 0:
+            self.out_of_uses[item_id] = None
+    
+    def _unindex(self, item_id):
+        item = self[item_id]
+        item.store = None
+        del self.sequence[item_id]
+        
+        name = normalize_name(item.name)
+        bucket = self.by_name[name]
+        del bucket[item_id]
+        if not bucket:
+            del self.by_name[name]
+            self.names.pop(bisect.bisect_left(self.names, name))
+        
+        if item.container_id:
+            self._discard(self.by_container, item.container_id, item_id)
+        self._discard(self.by_zone, item.preferred_zone, item_id)
+        
+        key = self.expiry_keys.pop(item_id, None)
+        if key is not None:
+            self.expiry.pop(bisect.bisect_left(self.expiry, key))
+        
+        self.out_of_uses.pop(item_id, None)
+    
+    @staticmethod
+    def _discard(index, key, item_id):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(item_id, None)
+            if not bucket:
+                del index[key]
+    
+    @synchronized
+    def reindex_container(self, item, old_container_id):
+        """Move an item between container buckets after it was placed"""
+        if old_container_id:
+            self._discard(self.by_container, old_container_id, item.item_id)
+        if item.container_id:
+            self.by_container.setdefault(item.container_id, {})[item.item_id] = None
+    
+    @synchronized
+    def reindex_uses(self, item):
+        """Track an item that has run out of uses"""
+        if item.uses_remaining <= 0:
+            self.out_of_uses[item.item_id] = None
+    
+    @synchronized
+    def find_by_name(self, name, mode="exact"):
+        """Get ids of items matching a name.
+
+        mode is "exact" (case and whitespace insensitive), "prefix" or
+        "fuzzy" (closest names by similarity).
+        """
+        name = normalize_name(name)
+        if mode == "prefix":
+            matches = []
+            position = bisect.bisect_left(self.names, name)
+            while position < len(self.names) and self.names[position].startswith(name):
+                matches.extend(self.by_name[self.names[position]])
+                position += 1
+            return sorted(matches, key=self.sequence.get)
+        if mode == "fuzzy":
+            matches = []
+            for close_name in difflib.get_close_matches(name, self.names, n=5, cutoff=0.6):
+                matches.extend(self.by_name[close_name])
+            return matches
+        return list(self.by_name.get(name, ()))
+    
+    @synchronized
+    def in_container(self, container_id):
+        """Get ids of items placed in a container"""
+        return list(self.by_container.get(container_id, ()))
+    
+    @synchronized
+    def in_zone(self, zone):
+        """Get ids of items whose preferred zone is zone"""
+        return list(self.by_zone.get(zone, ()))
+    
+    @synchronized
+    def expiring_before(self, date):
+        """Get ids of items whose expiry date is before date, soonest first"""
+        end = bisect.bisect_left(self.expiry, (to_micros(parse_date(date)),))
+        return [item_id for _, item_id in self.expiry[:end]]
+    
+    @synchronized
+    def expiring_between(self, start, end):
+        """Get ids of items whose expiry date is at or after start and before end"""
+        begin = bisect.bisect_left(self.expiry, (to_micros(parse_date(start)),))
+        end = bisect.bisect_left(self.expiry, (to_micros(parse_date(end)),))
+        return [item_id for _, item_id in self.expiry[begin:end]]
+    
+    @synchronized
+    def with_no_uses(self):
+        """Get ids of items that have run out of uses"""
+        return list(self.out_of_uses)
+
+
+items = ItemStore()
+clock = SimulationClock()
 
 
 def log_action(action_type, user_id, item_id, container_id=None, details=None):
     """Log an action in the system"""
-    log_entry = {
-        "logId": str(uuid.uuid4()),
-        "timestamp": datetime.now().isoformat(),
-        "actionType": action_type,
-        "userId": user_id,
-        "itemId": item_id,
-        "containerId": container_id,
-        "details": details or {}
-    }
-    logs.append(log_entry)
-    return log_entry
+    timestamp = time.time_ns() // 1000
+    count("csms_log_entries_total", action=action_type)
+    if log_writer is not None:
+        log_writer.submit((timestamp, action_type, user_id, item_id, container_id, details or {}))
+    return logs.append(action_type, user_id, item_id, container_id, details, timestamp=timestamp)
+
+
+def start_log_writer():
+    """Reload the log file and start writing new entries to it in the background"""
+    global log_writer
+    # Child processes only search placements and never log
+    if not config.LOG_FILE or log_writer is not None or in_worker_process():
+        return
+    replay(config.LOG_FILE, logs)
+    log_writer = LogWriter(
+        config.LOG_FILE,
+        queue_size=config.LOG_QUEUE_SIZE,
+        batch_size=config.LOG_BATCH_SIZE,
+        flush_interval=config.LOG_FLUSH_INTERVAL,
+        overflow=config.LOG_OVERFLOW
+    )
+    log_writer.start()
 
 
 def initialize_data():
@@ -178,3 +808,4 @@ def initialize_data():
 
 # Initialize data
 initialize_data()
+start_log_writer()
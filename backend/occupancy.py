@@ -0,0 +1,153 @@
+"""NumPy occupancy-grid representation of a container.
+
+The container is split into cubic cells of ``resolution`` cm and each cell is
+marked occupied if any item touches it, so with a resolution above 1 the grid
+is conservative: it may reject a tight fit but never accepts an overlap.
+Feasible positions for a box are found for a block of depth rows at once
+with a 3D summed-volume table. Items added to the container are painted into
+the grid and patched into the table; removals rebuild both.
+"""
+import math
+
+import numpy as np
+
+import config
+from concurrency import refreshed
+from instrumentation import timed, count
+
+# Depth rows of window positions checked together
+ROW_BLOCK = 8
+
+
+class OccupancyGrid:
+    """3D bitmap of occupied cells for one container"""
+
+    def __init__(self, container, resolution=1):
+        self.resolution = resolution
+        self.shape = (
+            container.width // resolution,
+            container.depth // resolution,
+            container.height // resolution
+        )
+        self.cells = np.zeros(self.shape, dtype=bool)
+        self.boxes = {}  # item_id -> box, as painted into cells
+        self.version = None
+        self._table = None
+
+    def _cell_range(self, box):
+        """Get the slice of cells touched by a box, clipped to the grid"""
+        r = self.resolution
+        return tuple(
+            slice(min(int(box[axis]) // r, size), min(-(-int(box[axis + 3]) // r), size))
+            for axis, size in enumerate(self.shape)
+        )
+
+    def paint(self, box):
+        """Mark the cells a box touches, patching the summed-volume table if built"""
+        cells = self._cell_range(box)
+        added = ~self.cells[cells]
+        self.cells[cells] = True
+        if self._table is None or not added.any():
+            return
+        # Each prefix sum grows by the new cells inside its region, which
+        # past the far side of the box is the count at that edge
+        counts = added.cumsum(0, dtype=np.int32).cumsum(1).cumsum(2)
+        counts = np.pad(counts, [(0, size - span.stop) for span, size in zip(cells, self.shape)], mode="edge")
+        self._table[tuple(slice(span.start + 1, None) for span in cells)] += counts
+
+    def refresh(self, container):
+        """Bring the bitmap up to date with the container's placed items.
+
+        Items only added since the last refresh are painted in; any removal
+        or move means the bitmap and its table are rebuilt from scratch.
+        """
+        boxes = container.boxes
+        if len(boxes) < len(self.boxes) or any(boxes.get(item_id) != box for item_id, box in self.boxes.items()):
+            self.cells[:] = False
+            self.boxes = {}
+            self._table = None
+        for item_id, box in boxes.items():
+            if item_id not in self.boxes:
+                self.paint(box)
+                self.boxes[item_id] = box
+        self.version = container.version
+
+    def summed_volume_table(self):
+        """Get the padded 3D prefix sum of occupied cells"""
+        if self._table is None:
+            table = np.zeros(tuple(size + 1 for size in self.shape), dtype=np.int32)
+            table[1:, 1:, 1:] = self.cells.cumsum(0, dtype=np.int32).cumsum(1).cumsum(2)
+            self._table = table
+        return self._table
+
+    def free_windows(self, width, depth, height, rows=None):
+        """Get a boolean array of cell positions where a box fits, or None.
+
+        rows, a range of depth cells, limits the positions to those depths.
+        """
+        r = self.resolution
+        a, b, c = -(-width // r), -(-depth // r), -(-height // r)
+        nx, ny, nz = (size - extent + 1 for size, extent in zip(self.shape, (a, b, c)))
+        y0, y1 = (0, ny) if rows is None else (max(rows.start, 0), min(rows.stop, ny))
+        if nx <= 0 or y1 <= y0 or nz <= 0:
+            return None
+
+        s = self.summed_volume_table()
+        # Inclusion-exclusion over the eight corners of every window at once
+        total = (
+            s[a:a + nx, b + y0:b + y1, c:c + nz]
+            - s[:nx, b + y0:b + y1, c:c + nz]
+            - s[a:a + nx, y0:y1, c:c + nz]
+            - s[a:a + nx, b + y0:b + y1, :nz]
+            + s[:nx, y0:y1, c:c + nz]
+            + s[:nx, b + y0:b + y1, :nz]
+            + s[a:a + nx, y0:y1, :nz]
+            - s[:nx, y0:y1, :nz]
+        )
+        return total == 0
+
+
+def get_occupancy_grid(container, resolution=None):
+    """Get the container's occupancy grid, refreshing it if the container changed"""
+    resolution = resolution or config.OCCUPANCY_RESOLUTION
+    return refreshed(
+        container, "occupancy",
+        lambda container: OccupancyGrid(container, resolution),
+        lambda grid: grid.resolution == resolution
+    )
+
+
+@timed
+def find_occupancy_fit(container, width, depth, height, stats=None, depth_limit=None, min_depth=0):
+    """Find the shallowest free position for a box using the occupancy grid.
+
+    Depths are checked a block of rows at a time from the shallowest, so the
+    search stops at the first block with a free position.
+    """
+    grid = get_occupancy_grid(container)
+    r = grid.resolution
+    row = math.ceil(min_depth / r)
+    stop = math.inf if depth_limit is None else math.ceil(depth_limit / r)
+
+    evaluated = 0
+    corner = None
+    while row < stop:
+        free = grid.free_windows(width, depth, height, range(row, min(row + ROW_BLOCK, stop)))
+        if free is None:
+            break
+        evaluated += free.size
+
+        # Shallowest depth first, then lowest width and height like the scan order
+        rows = np.flatnonzero(free.any(axis=(0, 2)))
+        if rows.size:
+            y = int(rows[0])
+            x, z = np.argwhere(free[:, y, :])[0]
+            corner = int(x) * r, (row + y) * r, int(z) * r
+            break
+        row += ROW_BLOCK
+
+    if stats is not None:
+        stats["candidatesEvaluated"] = stats.get("candidatesEvaluated", 0) + evaluated
+    count("csms_candidates_evaluated_total", evaluated)
+
+    return corner
@@ -0,0 +1,298 @@
+"""Durable state: a SQLite write-ahead journal plus periodic snapshots.
+
+Every mutating request records the resulting state of what it changed
+(items, containers, removed items, the simulation date) as one journal row.
+Every ``snapshot_interval`` rows a background thread writes the whole
+station as a compact snapshot and truncates the journal, so startup loads
+the snapshot and replays only the journal tail.
+
+Item rows keep their order in the ItemStore and in their container, so
+listings and the blocking graph are rebuilt exactly as they were.
+"""
+import atexit
+import json
+import sqlite3
+import threading
+
+import config
+from concurrency import in_worker_process
+from instrumentation import count
+from models import items, containers, clock, Container, Item
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL, payload TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS snapshot_items (item_id TEXT PRIMARY KEY, store_order INTEGER, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS snapshot_containers (container_id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def item_state(item):
+    """Get everything needed to rebuild an item, including its placement order"""
+    state = item.to_dict()
+    container = containers.get(item.container_id)
+    state["placementOrder"] = container.placement_order.get(item.item_id, -1) if container else -1
+    return state
+
+
+def restore_item(state):
+    """Rebuild an item (without its placement) from item_state"""
+    item = Item(
+        item_id=state["itemId"],
+        name=state["name"],
+        width=state["width"],
+        depth=state["depth"],
+        height=state["height"],
+        mass=state["mass"],
+        priority=state["priority"],
+        expiry_date=state["expiryDate"],
+        usage_limit=state["usageLimit"],
+        preferred_zone=state["preferredZone"]
+    )
+    item.uses_remaining = state["usesRemaining"]
+    return item
+
+
+def restore_container(state):
+    return Container(
+        container_id=state["containerId"],
+        zone=state["zone"],
+        width=state["width"],
+        depth=state["depth"],
+        height=state["height"]
+    )
+
+
+class Journal:
+    """Write-ahead journal and snapshots of the in-memory database"""
+
+    def __init__(self, path, snapshot_interval=1000):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.lock = threading.Lock()  # guards the connection and pending
+        self.snapshot_lock = threading.Lock()  # one snapshot at a time
+        self.connection = None
+        self.pending = 0  # journal rows since the last snapshot
+        self.replaying = False
+        self.snapshot_due = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    @property
+    def enabled(self):
+        return self.connection is not None and not self.replaying
+
+    def open(self):
+        """Open the database, load the saved state if there is any, and start journaling.
+
+        Child processes share the database path but not the state, so they never open it.
+        """
+        if not self.path or self.connection is not None or in_worker_process():
+            return False
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        has_snapshot = self.connection.execute("SELECT 1 FROM meta WHERE key = 'snapshot'").fetchone()
+        if has_snapshot:
+            self.load()
+        else:
+            # First run: the sample data becomes the first snapshot
+            self.snapshot()
+
+        self.thread = threading.Thread(target=self._run_snapshots, name="journal-snapshot", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+        return bool(has_snapshot)
+
+    def record(self, op, new_items=(), items=(), containers=(), removed_items=(), cleared_containers=(),
+               current_date=None):
+        """Append the state a mutation left behind to the journal.
+
+        new_items were created by the request (replacing any item with the same
+        id); items already existed and were used or moved.
+        """
+        if not self.enabled:
+            return
+        payload = {}
+        if containers:
+            payload["containers"] = [container.to_dict() for container in containers]
+        if removed_items:
+            payload["removedItems"] = list(removed_items)
+        if cleared_containers:
+            payload["clearedContainers"] = list(cleared_containers)
+        if new_items:
+            payload["newItems"] = [item_state(item) for item in new_items]
+        if items:
+            payload["items"] = [item_state(item) for item in items]
+        if current_date is not None:
+            payload["currentDate"] = current_date
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO journal (op, payload) VALUES (?, ?)",
+                (op, json.dumps(payload, separators=(",", ":")))
+            )
+            self.pending += 1
+            due = self.pending >= self.snapshot_interval
+        count("csms_journal_records_total", op=op)
+        if due:
+            # Written by the snapshot thread, not by the request that got here
+            self.snapshot_due.set()
+
+    def _run_snapshots(self):
+        while True:
+            self.snapshot_due.wait()
+            if self.stopping.is_set():
+                return
+            self.snapshot_due.clear()
+            self.snapshot()
+
+    def snapshot(self):
+        """Write the whole station and drop the journal rows it covers.
+
+        The last journal row is read before the state, so every row up to it
+        describes a change the snapshot already holds. Rows written while the
+        state is read stay in the journal and are replayed on top.
+        """
+        with self.snapshot_lock:
+            with self.lock:
+                connection = self.connection
+                if connection is None:
+                    return
+                last = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM journal").fetchone()[0]
+                covered = self.pending
+
+            with items.lock:
+                item_rows = [
+                    (item.item_id, items.sequence[item.item_id], json.dumps(item_state(item), separators=(",", ":")))
+                    for item in items.values()
+                ]
+                current_date = clock.get()
+            container_rows = [
+                (container.container_id, json.dumps(container.to_dict(), separators=(",", ":")))
+                for container in list(containers.values())
+            ]
+
+            with self.lock:
+                if self.connection is not connection:
+                    return
+                self._write_snapshot(connection, last, item_rows, container_rows, current_date)
+                self.pending -= covered
+
+    @staticmethod
+    def _write_snapshot(connection, last, item_rows, container_rows, current_date):
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM snapshot_items")
+            connection.execute("DELETE FROM snapshot_containers")
+            connection.executemany("INSERT INTO snapshot_items VALUES (?, ?, ?)", item_rows)
+            connection.executemany("INSERT INTO snapshot_containers VALUES (?, ?)", container_rows)
+            connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("snapshot", str(last)),
+                ("currentDate", current_date)
+            ])
+            connection.execute("DELETE FROM journal WHERE seq <= ?", (last,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def load(self):
+        """Replace the in-memory state with the snapshot plus the journal tail"""
+        connection = self.connection
+        items.clear()
+        containers.clear()
+
+        for (data,) in connection.execute("SELECT data FROM snapshot_containers"):
+            container = restore_container(json.loads(data))
+            containers[container.container_id] = container
+
+        restored = []
+        for (data,) in connection.execute("SELECT data FROM snapshot_items ORDER BY store_order"):
+            state = json.loads(data)
+            restored.append((state, restore_item(state)))
+        items.add_many([item for _, item in restored])
+        self.place(entry for entry in restored if entry[0]["position"])
+
+        current_date = connection.execute("SELECT value FROM meta WHERE key = 'currentDate'").fetchone()
+        if current_date:
+            clock.set(current_date[0])
+
+        snapshot_seq = int(connection.execute("SELECT value FROM meta WHERE key = 'snapshot'").fetchone()[0])
+        tail = connection.execute("SELECT payload FROM journal WHERE seq > ? ORDER BY seq", (snapshot_seq,))
+        self.replaying = True
+        try:
+            for (payload,) in tail:
+                self.apply(json.loads(payload))
+                self.pending += 1
+        finally:
+            self.replaying = False
+
+    def apply(self, payload):
+        """Redo one journal row"""
+        # Containers are only ever created, and a snapshot taken after the row
+        # was written may already hold this one with items in it
+        for state in payload.get("containers", ()):
+            if state["containerId"] not in containers:
+                containers[state["containerId"]] = restore_container(state)
+
+        for item_id in payload.get("removedItems", ()):
+            items.pop(item_id, None)
+
+        for container_id in payload.get("clearedContainers", ()):
+            if container_id in containers:
+                containers[container_id].occupied_spaces = []
+
+        to_place = []
+        for state in payload.get("newItems", ()):
+            old = items.get(state["itemId"])
+            if old is not None and old.container_id in containers:
+                containers[old.container_id].remove_item(old.item_id)
+            item = restore_item(state)
+            items[item.item_id] = item
+            if state["position"]:
+                to_place.append((state, item))
+
+        for state in payload.get("items", ()):
+            item = items.get(state["itemId"])
+            if item is None:
+                continue
+            item.consume(item.uses_remaining - state["usesRemaining"])
+            if (item.container_id, item.position) != (state["containerId"], state["position"]):
+                if item.container_id in containers:
+                    containers[item.container_id].remove_item(item.item_id)
+                item.set_position(None, None)
+                if state["position"]:
+                    to_place.append((state, item))
+
+        self.place(to_place)
+
+        if "currentDate" in payload:
+            clock.set(payload["currentDate"])
+
+    @staticmethod
+    def place(to_place):
+        """Put (state, item) pairs back in their containers"""
+        # In their original order, so blocking ties break the same way
+        for state, item in sorted(to_place, key=lambda entry: entry[0]["placementOrder"]):
+            container = containers.get(state["containerId"])
+            if container is not None:
+                position = state["position"]
+                container.restore_item(item.item_id, position["startCoordinates"], position["endCoordinates"])
+                item.set_position(state["containerId"], position)
+
+    def close(self):
+        """Stop the snapshot thread and close the database"""
+        if self.thread is not None and self.thread.is_alive():
+            self.stopping.set()
+            self.snapshot_due.set()
+            self.thread.join()
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+journal = Journal(config.PERSIST_PATH, config.PERSIST_SNAPSHOT_INTERVAL)
@@ -0,0 +1,114 @@
+"""LRU cache of fit searches, keyed by the state of the container searched.
+
+Manifests often hold many items of the same size and zone, and each one
+searches every container in all six orientations. A search only depends on
+the container's contents and the oriented box, so results are cached under
+(container id, container version, backend, box). Versions come from one
+process-wide counter and change whenever a container's items change, so an
+entry is never reused after its container changed and scratch copies never
+share entries with the real container. An item's six orientations are the
+same boxes whatever order its dimensions were given in, so items that differ
+only in orientation share entries too.
+
+A search returns the shallowest fit shallower than its depth limit, so a cached
+corner answers every later search of the same state, and a cached miss
+answers any later search with a limit no deeper than its own.
+"""
+import threading
+from collections import OrderedDict
+
+import config
+
+
+class PlacementCache:
+    """Bounded LRU map of fit search results with hit and miss counts"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (corner or None, depth limit searched)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def lookup(self, key, depth_limit):
+        """Get (True, corner) for a usable cached result, otherwise (False, None)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                corner, searched_limit = entry
+                if corner is not None:
+                    # The shallowest fit: shallower limits have none
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, corner if depth_limit is None or corner[1] < depth_limit else None
+                if searched_limit is None or (depth_limit is not None and depth_limit <= searched_limit):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, None
+            self.misses += 1
+            return False, None
+
+    def store(self, key, corner, depth_limit):
+        with self.lock:
+            entry = self.entries.get(key)
+            # A corner answers more searches than a miss, and a miss over a
+            # deeper range answers more than a shallower one
+            if entry is not None and corner is None:
+                searched_limit = entry[1]
+                if entry[0] is not None or searched_limit is None or (
+                    depth_limit is not None and depth_limit <= searched_limit
+                ):
+                    return
+            self.entries[key] = (corner, depth_limit)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def search(self, find_fit, backend, container, width, depth, height, stats=None, depth_limit=None, min_depth=0):
+        """Run find_fit for a box, reusing an earlier search of the same container state.
+
+        min_depth must be a depth the box is known not to fit above, as the
+        PackingState depth floors are, so the result is the same as a search
+        from the front of the container.
+        """
+        if not self.enabled:
+            return find_fit(container, width, depth, height, stats, depth_limit, min_depth)
+
+        key = (container.container_id, container.version, backend, (width, depth, height))
+        found, corner = self.lookup(key, depth_limit)
+        if found:
+            return corner
+
+        corner = find_fit(container, width, depth, height, stats, depth_limit, min_depth)
+        self.store(key, corner, depth_limit)
+        return corner
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Get the size and hit rate of the cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self.entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+
+placement_cache = PlacementCache(config.PLACEMENT_CACHE_SIZE)
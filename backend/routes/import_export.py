@@ -1,204 +1,285 @@
-from flask import Blueprint, request, jsonify, Response
-import csv
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import io
-from models import items, containers, Container, Item, log_action
+import json
+import queue
+import threading
+import time
+import config
+from models import items, containers, log_action
+from csv_import import import_item_chunks, import_container_chunks
+from arrangement_export import FORMATS, ARROW_FORMATS, pa, select_containers, export_chunks
+from algorithms import FIT_FUNCTIONS, PackingState, pack_items, container_utilization, parse_time_budget
+from persistence import journal
+from concurrency import write_locked
+from jobs import placement_jobs
 
 bp = Blueprint('import_export', __name__, url_prefix='/api')
 
-@bp.route('/import/items', methods=['POST'])
-def import_items():
+def uploaded_file():
+    """Get the uploaded CSV file, or an error response"""
     if 'file' not in request.files:
-        return jsonify({
+        return None, jsonify({
             "success": False,
             "message": "No file provided"
         })
     
     file = request.files['file']
     if file.filename == '':
-        return jsonify({
+        return None, jsonify({
             "success": False,
             "message": "No file selected"
         })
     
-    # Process CSV
-    items_imported = 0
-    errors = []
+    return file, None
+
+def place_imported(imported, summary, keep_results, time_budget=None, mode=None, job=None):
+    """Place imported items in one batched pass, yielding each result as it is made.
+
+    The pass runs on its own thread, which holds the container locks and
+    hands each result over through a queue, so results stream as they are
+    found and a slow streaming client cannot hold up other placements.
+    """
+    if job is not None:
+        job.total = len(imported)
+    available_containers = list(containers.values())
     
-    try:
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        csv_reader = csv.DictReader(stream)
-        
-        for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 to account for header
-            try:
-                item_id = row.get('Item ID')
-                
-                if not item_id:
-                    errors.append({
-                        "row": row_num,
-                        "message": "Missing Item ID"
-                    })
-                    continue
+    placement = {"placedCount": 0, "unplacedCount": 0, "timedOut": False, "cancelled": False}
+    if keep_results:
+        placement["placements"] = []
+        placement["unplaced"] = []
+    results = queue.SimpleQueue()
+    
+    def run():
+        placed = []
+        try:
+            # Every container may receive items, so hold them all for the whole pass
+            with write_locked(available_containers):
+                # Re-imported items are placed afresh, so drop where they were before
+                for container in available_containers:
+                    for item in imported:
+                        if item.item_id in container.boxes:
+                            container.remove_item(item.item_id)
                 
-                # Create new item
-                item = Item(
-                    item_id=item_id,
-                    name=row.get('Name', ''),
-                    width=int(row.get('Width (cm)', 0)),
-                    depth=int(row.get('Depth (cm)', 0)),
-                    height=int(row.get('Height (cm)', 0)),
-                    mass=float(row.get('Mass (kg)', 0)),
-                    priority=int(row.get('Priority (1-100)', 50)),
-                    expiry_date=row.get('Expiry Date (ISO Format)', 'N/A'),
-                    usage_limit=int(row.get('Usage Limit', 1)),
-                    preferred_zone=row.get('Preferred Zone', '')
-                )
+                state = PackingState(available_containers, mode)
+                started = time.perf_counter()
                 
-                # Add to items dictionary
-                items[item_id] = item
-                items_imported += 1
+                for result in pack_items(
+                    imported, available_containers, time_budget=time_budget, backend=mode, state=state,
+                    stop=job.cancel_event if job is not None else None
+                ):
+                    if "containerId" in result:
+                        placement["placedCount"] += 1
+                        placed.append(items[result["itemId"]])
+                        log_action(
+                            action_type="placement",
+                            user_id="system",
+                            item_id=result["itemId"],
+                            container_id=result["containerId"],
+                            details={"position": result["position"]}
+                        )
+                    else:
+                        placement["unplacedCount"] += 1
+                        if result["reason"] == "Time budget exceeded":
+                            placement["timedOut"] = True
+                        elif result["reason"] == "Cancelled":
+                            placement["cancelled"] = True
+                    if keep_results:
+                        placement["placements" if "containerId" in result else "unplaced"].append(result)
+                    if job is not None:
+                        job.record(result)
+                    results.put(result)
                 
-            except Exception as e:
-                errors.append({
-                    "row": row_num,
-                    "message": str(e)
-                })
+                placement["utilization"] = container_utilization(available_containers, state)
+                placement["elapsedSeconds"] = time.perf_counter() - started
+        except Exception as e:
+            results.put(e)
+        finally:
+            # Placements made so far are kept even if the pass failed part way
+            journal.record("placement", items=placed)
+            results.put(None)
+    
+    threading.Thread(target=run, name="import-placement", daemon=True).start()
+    
+    # The pass carries on to the end even if the client goes away
+    while True:
+        result = results.get()
+        if result is None:
+            break
+        if isinstance(result, Exception):
+            raise result
+        yield result
+    
+    summary["placement"] = placement
+
+def run_import(file, import_chunks, count_key, action_type, place=False):
+    """Run an import, returning the summary as JSON or streaming progress.
+
+    With ?stream=true every chunk's progress is sent as a JSON line as soon as
+    it is processed, followed by the summary line. With place set the imported
+    items are then placed in one batched pass, streaming a line per item.
+    With place and ?async=true the import and placement run as a job instead
+    and the response only carries its id (see /api/jobs).
+    """
+    streaming = request.args.get('stream') == 'true'
+    asynchronous = place and request.args.get('async') == 'true'
+    
+    # Optional time budget in seconds for the whole placement pass
+    try:
+        time_budget = parse_time_budget(request.args.get('timeBudget'))
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        })
+    mode = request.args.get('placementMode')
+    
+    stream = file.stream
+    if streaming or asynchronous:
+        # The request closes its files before the response is streamed, so
+        # keep the upload open until the import is done
+        file.stream = io.BytesIO()
+    
+    def summarize(job=None):
+        summary = {"success": True, count_key: 0, "errors": [], "errorCount": 0}
+        imported = {}
+        try:
+            for progress in import_chunks(stream):
+                if job is not None and job.cancelled:
+                    break
+                journal.record(
+                    action_type,
+                    new_items=progress.get("items", ()),
+                    containers=progress.get("containers", ())
+                )
+                if place:
+                    # Later rows replace earlier ones with the same id
+                    imported.update((item.item_id, item) for item in progress["items"])
+                summary[count_key] = progress[count_key]
+                summary["errorCount"] += len(progress["errors"])
+                room = config.IMPORT_MAX_ERRORS - len(summary["errors"])
+                summary["errors"].extend(progress["errors"][:max(room, 0)])
+                yield {
+                    "rowsProcessed": progress["rowsProcessed"],
+                    count_key: progress[count_key],
+                    "errors": progress["errors"]
+                }
+        except Exception as e:
+            summary["success"] = False
+            summary["message"] = str(e)
+        finally:
+            if streaming or asynchronous:
+                stream.close()
         
         # Log the import
         log_action(
-            action_type="import_items",
+            action_type=action_type,
             user_id="system",
             item_id=None,
             container_id=None,
             details={
-                "itemsImported": items_imported,
-                "errors": len(errors)
+                count_key: summary[count_key],
+                "errors": summary["errorCount"]
             }
         )
         
+        if place and summary["success"]:
+            yield from place_imported(
+                list(imported.values()), summary, not streaming, time_budget, mode, job
+            )
+        yield summary
+    
+    if asynchronous:
+        def run(job):
+            summary = None
+            for summary in summarize(job):
+                pass
+            return summary
+        
+        # A job cancelled before it starts never reads the upload, so close it then
+        job = placement_jobs.submit("import", run, discard=stream.close)
         return jsonify({
             "success": True,
-            "itemsImported": items_imported,
-            "errors": errors
+            "jobId": job.job_id,
+            "status": job.status
         })
-        
-    except Exception as e:
+    
+    if streaming:
+        lines = (json.dumps(line) + "\n" for line in summarize())
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+    
+    summary = None
+    for summary in summarize():
+        pass
+    return jsonify(summary)
+
+@bp.route('/import/items', methods=['POST'])
+def import_items():
+    file, error = uploaded_file()
+    if error:
+        return error
+    
+    # Optionally place everything that was imported in one batched pass
+    place = request.args.get('place') == 'true'
+    mode = request.args.get('placementMode')
+    if place and mode is not None and mode not in FIT_FUNCTIONS:
         return jsonify({
             "success": False,
-            "message": str(e)
+            "message": f"Unknown placementMode: {mode}"
         })
+    
+    return run_import(file, import_item_chunks, "itemsImported", "import_items", place=place)
 
 @bp.route('/import/containers', methods=['POST'])
 def import_containers():
-    if 'file' not in request.files:
+    file, error = uploaded_file()
+    if error:
+        return error
+    
+    return run_import(file, import_container_chunks, "containersImported", "import_containers")
+
+@bp.route('/export/arrangement', methods=['GET'])
+def export_arrangement():
+    # Output format and optional filters (containerId may be repeated or comma-separated)
+    file_format = request.args.get('format', 'csv')
+    container_ids = [
+        container_id
+        for value in request.args.getlist('containerId')
+        for container_id in value.split(',') if container_id
+    ]
+    zone = request.args.get('zone')
+    
+    if file_format not in FORMATS:
         return jsonify({
             "success": False,
-            "message": "No file provided"
+            "message": f"Unknown format: {file_format}"
         })
     
-    file = request.files['file']
-    if file.filename == '':
+    if file_format in ARROW_FORMATS and pa is None:
         return jsonify({
             "success": False,
-            "message": "No file selected"
+            "message": f"The {file_format} format requires pyarrow"
         })
     
-    # Process CSV
-    containers_imported = 0
-    errors = []
+    selected = select_containers(container_ids, zone)
+    mimetype, extension = FORMATS[file_format]
     
-    try:
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        csv_reader = csv.DictReader(stream)
+    def generate():
+        yield from export_chunks(file_format, selected)
         
-        for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 to account for header
-            try:
-                container_id = row.get('Container ID')
-                
-                if not container_id:
-                    errors.append({
-                        "row": row_num,
-                        "message": "Missing Container ID"
-                    })
-                    continue
-                
-                # Create new container
-                container = Container(
-                    container_id=container_id,
-                    zone=row.get('Zone', ''),
-                    width=int(row.get('Width(cm)', 0)),
-                    depth=int(row.get('Depth(cm)', 0)),
-                    height=int(row.get('Height(height)', 0))
-                )
-                
-                # Add to containers dictionary
-                containers[container_id] = container
-                containers_imported += 1
-                
-            except Exception as e:
-                errors.append({
-                    "row": row_num,
-                    "message": str(e)
-                })
-        
-        # Log the import
+        # Log the export
         log_action(
-            action_type="import_containers",
+            action_type="export_arrangement",
             user_id="system",
             item_id=None,
             container_id=None,
             details={
-                "containersImported": containers_imported,
-                "errors": len(errors)
+                "format": file_format,
+                "containersExported": len(selected)
             }
         )
-        
-        return jsonify({
-            "success": True,
-            "containersImported": containers_imported,
-            "errors": errors
-        })
-        
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "message": str(e)
-        })
-
-@bp.route('/export/arrangement', methods=['GET'])
-def export_arrangement():
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['Item ID', 'Container ID', 'Coordinates (W1,D1,H1),(W2,D2,H2)'])
-    
-    # Write data
-    for item_id, item in items.items():
-        if item.container_id and item.position:
-            container_id = item.container_id
-            start = item.position['startCoordinates']
-            end = item.position['endCoordinates']
-            
-            coordinates = f"({start['width']},{start['depth']},{start['height']}),({end['width']},{end['depth']},{end['height']})"
-            writer.writerow([item_id, container_id, coordinates])
-    
-    # Prepare response
-    output.seek(0)
-    
-    # Log the export
-    log_action(
-        action_type="export_arrangement",
-        user_id="system",
-        item_id=None,
-        container_id=None,
-        details={
-            "itemsExported": len(items)
-        }
-    )
     
     return Response(
-        output,
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment;filename=arrangement.csv"}
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment;filename=arrangement.{extension}"}
     )
@@ -0,0 +1,72 @@
+from flask import Blueprint, request, jsonify
+from jobs import placement_jobs, FINISHED
+
+bp = Blueprint('jobs', __name__, url_prefix='/api')
+
+def job_not_found():
+    return jsonify({
+        "success": False,
+        "message": "Job not found"
+    })
+
+@bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    # Progress of every kept job, without the per-item results
+    jobs = []
+    for job in placement_jobs.list():
+        progress = job.progress()
+        del progress["results"], progress["since"]
+        jobs.append(progress)
+    
+    return jsonify({
+        "success": True,
+        "jobs": jobs
+    })
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = placement_jobs.get(job_id)
+    if job is None:
+        return job_not_found()
+    
+    # Item results from index since on, so polling only fetches what is new
+    since = request.args.get('since', 0, type=int)
+    return jsonify({
+        "success": True,
+        "job": job.progress(max(since, 0))
+    })
+
+@bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = placement_jobs.cancel(job_id)
+    if job is None:
+        return job_not_found()
+    
+    return jsonify({
+        "success": True,
+        "jobId": job.job_id,
+        "status": job.status
+    })
+
+@bp.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = placement_jobs.get(job_id)
+    if job is None:
+        return job_not_found()
+    
+    if job.status not in FINISHED:
+        return jsonify({
+            "success": False,
+            "message": "Job has not finished",
+            "status": job.status
+        })
+    
+    if job.result is None:
+        return jsonify({
+            "success": False,
+            "message": job.message or "Job was cancelled before it started",
+            "status": job.status
+        })
+    
+    # The same response the placement would have given without async, as far as it got
+    return jsonify(dict(job.result, jobId=job.job_id, status=job.status))
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
-from models import logs
-from dateutil import parser
+from datetime import timedelta
+import models
+from models import logs, parse_date
 
 bp = Blueprint('logs', __name__, url_prefix='/api')
 
@@ -8,13 +9,47 @@ bp = Blueprint('logs', __name__, url_prefix='/api')
 def get_logs():
     start_date = request.args.get('startDate')
     end_date = request.args.get('endDate')
-    item_id = request.args.get('itemId')
-    user_id = request.args.get('userId')
-    action_type = request.args.get('actionType')
+    item_id = request.args.get('itemId') or None
+    user_id = request.args.get('userId') or None
+    action_type = request.args.get('actionType') or None
     
-    filtered_logs = logs
+    # Optional paging: at most limit entries after the cursor (a logId)
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=int)
     
-    # Filter by date range
-    if start_date:
-        start_date = parser.parse(start_date)
-        filtered_logs = [log for log in filtered_logs if parser.parse(log['timestamp']) >= start_date]
+    # The date range is inclusive of endDate
+    start = parse_date(start_date) if start_date else None
+    end = parse_date(end_date) if end_date else None
+    if end is not None:
+        end += timedelta(microseconds=1)
+    
+    filtered_logs, next_cursor = logs.query(
+        start=start,
+        end=end,
+        item_id=item_id,
+        user_id=user_id,
+        action_type=action_type,
+        cursor=cursor,
+        limit=limit
+    )
+    
+    return jsonify({
+        "success": True,
+        "logs": filtered_logs,
+        "nextCursor": next_cursor
+    })
+
+@bp.route('/logs/writer', methods=['GET'])
+def get_log_writer_stats():
+    # Backpressure metrics of the background log file writer
+    if models.log_writer is None:
+        return jsonify({
+            "success": True,
+            "enabled": False
+        })
+    
+    return jsonify({
+        "success": True,
+        "enabled": True,
+        "stats": models.log_writer.stats()
+    })
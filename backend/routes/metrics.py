@@ -0,0 +1,36 @@
+from flask import Blueprint, Response
+import re
+import models
+from models import items, containers, logs, item_columns
+from instrumentation import metrics
+from placement_cache import placement_cache
+from jobs import placement_jobs
+
+bp = Blueprint('metrics', __name__, url_prefix='/api')
+
+def station_gauges():
+    """Get the (name, help, labels, value) samples read at scrape time"""
+    gauges = [
+        ("csms_items", "Items in the station", {}, len(items)),
+        ("csms_item_rows", "Rows in use in the item columns", {}, len(item_columns)),
+        ("csms_containers", "Containers in the station", {}, len(containers)),
+        ("csms_log_entries", "Entries in the action log", {}, len(logs))
+    ]
+
+    cache = placement_cache.stats()
+    for key in ("entries", "hits", "misses", "evictions"):
+        gauges.append(("csms_placement_cache_" + key, "Placement cache " + key, {}, cache[key]))
+
+    for status, jobs in placement_jobs.counts().items():
+        gauges.append(("csms_placement_jobs", "Kept placement jobs by status", {"status": status}, jobs))
+
+    if models.log_writer is not None:
+        for key, value in models.log_writer.stats().items():
+            name = "csms_log_writer_" + re.sub(r"(?<!^)(?=[A-Z])", "_", key).lower()
+            gauges.append((name, "Background log writer " + key, {}, value))
+    return gauges
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus text exposition format
+    return Response(metrics.render(station_gauges()), mimetype="text/plain; version=0.0.4")
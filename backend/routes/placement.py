@@ -1,33 +1,57 @@
 from flask import Blueprint, request, jsonify
-from models import items, containers, Item, log_action
-from algorithms import find_optimal_placement
+from models import items, containers, Container, Item, log_action
+from algorithms import (
+    FIT_FUNCTIONS, find_and_place, pack_manifest, plan_rearrangement, apply_rearrangement, parse_time_budget
+)
+from concurrency import write_locked
+from persistence import journal
+from placement_cache import placement_cache
+from jobs import placement_jobs
 
 bp = Blueprint('placement', __name__, url_prefix='/api')
 
-@bp.route('/placement', methods=['POST'])
-def placement_recommendations():
-    data = request.json
-    
-    # Process new items
+def placement_mode_error(mode):
+    """Get an error response for an unknown placement mode, or None"""
+    if mode is None or mode in FIT_FUNCTIONS:
+        return None
+    return jsonify({
+        "success": False,
+        "message": f"Unknown placementMode: {mode}"
+    })
+
+def register_request_items(data):
+    """Create the items listed in a placement request.
+
+    Raises ValueError, before any item is stored, if a dimension, priority
+    or usage limit is not a whole number.
+    """
     new_items = []
     for item_data in data.get('items', []):
         item_id = item_data.get('itemId')
-        item = Item(
-            item_id=item_id,
-            name=item_data.get('name'),
-            width=item_data.get('width'),
-            depth=item_data.get('depth'),
-            height=item_data.get('height'),
-            mass=item_data.get('mass'),
-            priority=item_data.get('priority'),
-            expiry_date=item_data.get('expiryDate'),
-            usage_limit=item_data.get('usageLimit'),
-            preferred_zone=item_data.get('preferredZone')
-        )
-        items[item_id] = item
+        try:
+            item = Item(
+                item_id=item_id,
+                name=item_data.get('name'),
+                width=item_data.get('width'),
+                depth=item_data.get('depth'),
+                height=item_data.get('height'),
+                mass=item_data.get('mass'),
+                priority=item_data.get('priority'),
+                expiry_date=item_data.get('expiryDate'),
+                usage_limit=item_data.get('usageLimit'),
+                preferred_zone=item_data.get('preferredZone')
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid item {item_id}: {e}") from None
         new_items.append(item)
     
-    # Process new containers
+    for item in new_items:
+        items[item.item_id] = item
+    return new_items
+
+def register_request_containers(data):
+    """Create the containers listed in a placement request that do not exist yet"""
+    new_containers = []
     for container_data in data.get('containers', []):
         container_id = container_data.get('containerId')
         if container_id not in containers:
@@ -38,47 +62,203 @@ def placement_recommendations():
                 depth=container_data.get('depth'),
                 height=container_data.get('height')
             )
+            new_containers.append(containers[container_id])
+    return new_containers
+
+def place_item(item, mode, rearrangements, moved_items):
+    """Place one item, moving lower-priority items to make room if needed.
+
+    Rearrangement steps are added to rearrangements and the items they moved
+    to moved_items. Returns the placement, or None if the item did not fit.
+    """
+    container_list = list(containers.values())
+    best_container, best_position = find_and_place(item, container_list, backend=mode)
     
-    # Find placements for new items
+    if not best_container:
+        # Make room by moving lower-priority items to other containers
+        with write_locked(container_list):
+            best_container, best_position, moves = plan_rearrangement(item, container_list, backend=mode)
+            if best_container:
+                steps = apply_rearrangement(moves, step_number=len(rearrangements) + 1)
+                rearrangements.extend(steps)
+                
+                # Add item to container
+                best_container.add_item(
+                    item.item_id, 
+                    best_position["startCoordinates"], 
+                    best_position["endCoordinates"]
+                )
+                
+                # Update item position
+                item.set_position(best_container.container_id, best_position)
+        
+        if best_container:
+            for move in moves:
+                moved_items.append(items[move["itemId"]])
+                log_action(
+                    action_type="rearrangement",
+                    user_id="system",
+                    item_id=move["itemId"],
+                    container_id=move["toContainer"],
+                    details={
+                        "fromContainer": move["fromContainer"],
+                        "position": move["position"],
+                        "forItem": item.item_id
+                    }
+                )
+    
+    if not (best_container and best_position):
+        return None
+    
+    # Log the placement
+    log_action(
+        action_type="placement",
+        user_id="system",
+        item_id=item.item_id,
+        container_id=best_container.container_id,
+        details={"position": best_position}
+    )
+    
+    return {
+        "itemId": item.item_id,
+        "containerId": best_container.container_id,
+        "position": best_position
+    }
+
+def place_request_items(new_items, new_containers, mode, job=None):
+    """Place a request's items one at a time, reporting each to the job if given"""
     placements = []
     rearrangements = []
+    moved_items = []
     
-    for item in new_items:
-        container_list = list(containers.values())
-        best_container, best_position = find_optimal_placement(item, container_list)
-        
-        if best_container and best_position:
-            # Add item to container
-            best_container.add_item(
-                item.item_id, 
-                best_position["startCoordinates"], 
-                best_position["endCoordinates"]
-            )
-            
-            # Update item position
-            item.set_position(best_container.container_id, best_position)
+    try:
+        for item in new_items:
+            if job is not None and job.cancelled:
+                break
             
-            # Add to placements
-            placements.append({
-                "itemId": item.item_id,
-                "containerId": best_container.container_id,
-                "position": best_position
-            })
-            
-            # Log the placement
-            log_action(
-                action_type="placement",
-                user_id="system",
-                item_id=item.item_id,
-                container_id=best_container.container_id,
-                details={"position": best_position}
-            )
-        else:
-            # TODO: Implement rearrangement logic if no space is found
-            pass
+            placement = place_item(item, mode, rearrangements, moved_items)
+            if placement:
+                placements.append(placement)
+            if job is not None:
+                job.record(placement or {"itemId": item.item_id, "reason": "No space available"})
+    finally:
+        journal.record("placement", new_items=new_items, items=moved_items, containers=new_containers)
     
-    return jsonify({
+    return {
         "success": True,
         "placements": placements,
         "rearrangements": rearrangements
+    }
+
+def pack_request_items(new_items, new_containers, time_budget, mode, job=None):
+    """Pack a batch request's items with every container write-locked"""
+    container_list = list(containers.values())
+    try:
+        with write_locked(container_list):
+            plan = pack_manifest(
+                new_items, container_list, time_budget=time_budget, backend=mode,
+                on_result=job.record if job is not None else None,
+                stop=job.cancel_event if job is not None else None
+            )
+    finally:
+        journal.record("placement", new_items=new_items, containers=new_containers)
+    
+    for placement in plan["placements"]:
+        log_action(
+            action_type="placement",
+            user_id="system",
+            item_id=placement["itemId"],
+            container_id=placement["containerId"],
+            details={"position": placement["position"]}
+        )
+    
+    return {
+        "success": True,
+        "placements": plan["placements"],
+        "unplaced": plan["unplaced"],
+        "utilization": plan["utilization"],
+        "timedOut": plan["timedOut"],
+        "elapsedSeconds": plan["elapsedSeconds"]
+    }
+
+def start_job(kind, run, new_items, new_containers):
+    """Run a placement in the background and respond with its job id.
+
+    The request's items are already stored, so a job cancelled before it
+    starts still journals them, unplaced.
+    """
+    job = placement_jobs.submit(
+        kind, run, len(new_items),
+        discard=lambda: journal.record("placement", new_items=new_items, containers=new_containers)
+    )
+    return jsonify({
+        "success": True,
+        "jobId": job.job_id,
+        "status": job.status
+    })
+
+@bp.route('/placement', methods=['POST'])
+def placement_recommendations():
+    data = request.json
+    
+    # Optional placement backend, e.g. "heightmap" to stack items under gravity
+    mode = data.get('placementMode')
+    error = placement_mode_error(mode)
+    if error:
+        return error
+    
+    try:
+        new_items = register_request_items(data)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        })
+    new_containers = register_request_containers(data)
+    
+    # With async set, respond at once and place the items as a job (see /api/jobs)
+    if data.get('async'):
+        return start_job(
+            "placement",
+            lambda job: place_request_items(new_items, new_containers, mode, job),
+            new_items, new_containers
+        )
+    
+    return jsonify(place_request_items(new_items, new_containers, mode))
+
+@bp.route('/placement/batch', methods=['POST'])
+def batch_placement():
+    data = request.json
+    
+    mode = data.get('placementMode')
+    error = placement_mode_error(mode)
+    if error:
+        return error
+    
+    try:
+        # Optional time budget in seconds for the whole manifest
+        time_budget = parse_time_budget(data.get('timeBudget'))
+        new_items = register_request_items(data)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        })
+    new_containers = register_request_containers(data)
+    
+    if data.get('async'):
+        return start_job(
+            "batch",
+            lambda job: pack_request_items(new_items, new_containers, time_budget, mode, job),
+            new_items, new_containers
+        )
+    
+    return jsonify(pack_request_items(new_items, new_containers, time_budget, mode))
+
+@bp.route('/placement/cache', methods=['GET'])
+def get_placement_cache_stats():
+    # Hit rate of the fit search cache shared by all placements
+    return jsonify({
+        "success": True,
+        "stats": placement_cache.stats()
     })
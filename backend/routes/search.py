@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from models import items, containers, log_action
 from algorithms import calculate_retrieval_steps
+from persistence import journal
+from concurrency import read_locked, write_locked
 
 bp = Blueprint('search', __name__, url_prefix='/api')
 
@@ -9,16 +11,16 @@ def search_item():
     item_id = request.args.get('itemId')
     item_name = request.args.get('itemName')
     user_id = request.args.get('userId', 'unknown')
+    match_mode = request.args.get('matchMode', 'exact')  # exact, prefix or fuzzy
     
     # Find item by ID or name
     found_item = None
     if item_id and item_id in items:
         found_item = items[item_id]
     elif item_name:
-        for item in items.values():
-            if item.name.lower() == item_name.lower():
-                found_item = item
-                break
+        matches = items.find_by_name(item_name, match_mode)
+        if matches:
+            found_item = items[matches[0]]
     
     if not found_item:
         return jsonify({
@@ -42,7 +44,8 @@ def search_item():
     container = containers[container_id]
     
     # Calculate retrieval steps
-    retrieval_steps = calculate_retrieval_steps(container, found_item.item_id)
+    with read_locked([container]):
+        retrieval_steps = calculate_retrieval_steps(container, found_item.item_id)
     
     # Log the search
     log_action(
@@ -83,6 +86,7 @@ def retrieve_item():
     
     # Use the item (decrement usage count)
     item.use_item()
+    journal.record("retrieval", items=[item])
     
     # Log the retrieval
     log_action(
@@ -120,19 +124,24 @@ def place_item():
     
     item = items[item_id]
     container = containers[container_id]
-    
-    # Remove item from old container if it exists
-    if item.container_id and item.container_id in containers:
-        old_container = containers[item.container_id]
-        old_container.remove_item(item_id)
+    old_container = containers.get(item.container_id)
     
     # Add item to new container
     start_coords = position.get('startCoordinates')
     end_coords = position.get('endCoordinates')
     
-    if container.add_item(item_id, start_coords, end_coords):
-        # Update item position
-        item.set_position(container_id, position)
+    with write_locked([container] + ([old_container] if old_container else [])):
+        # Remove item from old container if it exists
+        if old_container:
+            old_container.remove_item(item_id)
+        
+        placed = container.add_item(item_id, start_coords, end_coords)
+        if placed:
+            # Update item position
+            item.set_position(container_id, position)
+    
+    if placed:
+        journal.record("placement", items=[item])
         
         # Log the placement
         log_action(
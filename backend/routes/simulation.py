@@ -1,15 +1,23 @@
+import math
+import config
 from flask import Blueprint, request, jsonify
-from models import items, containers, log_action, current_date
-from algorithms import simulate_day
+from models import items, clock, log_action, parse_date
+from algorithms import simulate_day, simulate_days
+from persistence import journal
 
 bp = Blueprint('simulation', __name__, url_prefix='/api')
 
 @bp.route('/simulate/day', methods=['POST'])
 def simulate_one_day():
     data = request.json
+    
+    if 'numOfDays' in data or 'toTimestamp' in data:
+        return fast_forward(data)
+    
     items_used = data.get('itemsUsed', [])
     
     new_date, changes = simulate_day(items_used)
+    record_simulation(new_date, changes)
     
     # Log the simulation
     log_action(
@@ -30,3 +38,80 @@ def simulate_one_day():
         "newDate": new_date,
         "changes": changes
     })
+
+def record_simulation(new_date, changes):
+    """Journal the new date and the items whose uses changed"""
+    used = [items[entry["itemId"]] for entry in changes["itemsUsed"] if entry["itemId"] in items]
+    journal.record("simulation", items=used, current_date=new_date)
+
+def entry_ids(entries):
+    """Get item ids from a list of ids or {"itemId": ...} objects"""
+    return [entry.get('itemId') if isinstance(entry, dict) else entry for entry in entries]
+
+def parse_num_days(value):
+    """Get a number of days as a whole number from 0 to the configured limit, or None"""
+    try:
+        num_days = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if isinstance(value, float) and num_days != value:
+        return None
+    if not 0 <= num_days <= config.SIMULATION_MAX_DAYS:
+        return None
+    return num_days
+
+def fast_forward(data):
+    """Advance several days in one request"""
+    num_days = data.get('numOfDays')
+    if num_days is not None:
+        num_days = parse_num_days(num_days)
+        if num_days is None:
+            return jsonify({
+                "success": False,
+                "message": f"numOfDays must be a whole number from 0 to {config.SIMULATION_MAX_DAYS}"
+            })
+    else:
+        try:
+            target = parse_date(data.get('toTimestamp'))
+        except ValueError:
+            target = None
+        if target is None:
+            return jsonify({
+                "success": False,
+                "message": "Invalid toTimestamp"
+            })
+        elapsed = target - clock.now()
+        num_days = max(math.ceil(elapsed.total_seconds() / 86400), 0)
+        if num_days > config.SIMULATION_MAX_DAYS:
+            return jsonify({
+                "success": False,
+                "message": f"toTimestamp is more than {config.SIMULATION_MAX_DAYS} days ahead"
+            })
+    
+    # Items used every day, plus an optional list of the items used on each day
+    items_used_per_day = entry_ids(data.get('itemsToBeUsedPerDay', []))
+    usage_schedule = [entry_ids(day) for day in data.get('usageSchedule') or []]
+    
+    new_date, changes, daily_changes = simulate_days(num_days, items_used_per_day, usage_schedule)
+    record_simulation(new_date, changes)
+    
+    log_action(
+        action_type="simulation",
+        user_id="system",
+        item_id=None,
+        container_id=None,
+        details={
+            "newDate": new_date,
+            "numOfDays": num_days,
+            "itemsUsed": len(changes["itemsUsed"]),
+            "itemsExpired": len(changes["itemsExpired"]),
+            "itemsOutOfUses": len(changes["itemsOutOfUses"])
+        }
+    )
+    
+    return jsonify({
+        "success": True,
+        "newDate": new_date,
+        "changes": changes,
+        "dailyChanges": daily_changes
+    })
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from models import items, containers, log_action
-from algorithms import identify_waste_items, create_waste_return_plan
+from algorithms import identify_waste_items, create_waste_return_plan, parse_time_budget
+from persistence import journal
+from concurrency import read_locked, write_locked
 
 bp = Blueprint('waste', __name__, url_prefix='/api/waste')
 
@@ -19,6 +21,22 @@ def waste_return_plan():
     undocking_container_id = data.get('undockingContainerId')
     undocking_date = data.get('undockingDate')
     max_weight = data.get('maxWeight', float('inf'))
+    max_volume = data.get('maxVolume')
+    objective = data.get('objective', 'mass')  # mass or volume
+    
+    if objective not in ('mass', 'volume'):
+        return jsonify({
+            "success": False,
+            "message": f"Unknown objective: {objective}"
+        })
+    
+    try:
+        time_budget = parse_time_budget(data.get('timeBudget'))
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        })
     
     if not undocking_container_id or undocking_container_id not in containers:
         return jsonify({
@@ -26,9 +44,10 @@ def waste_return_plan():
             "message": "Undocking container not found"
         })
     
-    return_plan, retrieval_steps, return_manifest = create_waste_return_plan(
-        undocking_container_id, max_weight
-    )
+    with read_locked(list(containers.values())):
+        return_plan, retrieval_steps, return_manifest = create_waste_return_plan(
+            undocking_container_id, max_weight, max_volume, objective, time_budget
+        )
     
     # Log the return plan
     log_action(
@@ -62,18 +81,17 @@ def complete_undocking():
             "message": "Undocking container not found"
         })
     
-    # Get all items in the undocking container
-    items_to_remove = []
-    for item_id, item in items.items():
-        if item.container_id == undocking_container_id:
-            items_to_remove.append(item_id)
-    
-    # Remove items
-    for item_id in items_to_remove:
-        del items[item_id]
-    
-    # Clear the container
-    containers[undocking_container_id].occupied_spaces = []
+    with write_locked([containers[undocking_container_id]]):
+        # Get all items in the undocking container
+        items_to_remove = items.in_container(undocking_container_id)
+        
+        # Remove items
+        for item_id in items_to_remove:
+            del items[item_id]
+        
+        # Clear the container
+        containers[undocking_container_id].occupied_spaces = []
+    journal.record("undocking", removed_items=items_to_remove, cleared_containers=[undocking_container_id])
     
     # Log the undocking
     log_action(
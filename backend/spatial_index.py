@@ -0,0 +1,95 @@
+"""Spatial indexes used by Container to find items near a region.
+
+An index is a broad phase only: ``candidates`` may return items that do not
+actually touch the region, and the container applies the exact overlap test.
+Boxes and regions are (x0, y0, z0, x1, y1, z1) tuples and are treated as
+closed, so items that merely touch a face are still returned.
+"""
+
+
+class LinearIndex:
+    """Index that returns every item (the original full scan)"""
+
+    def __init__(self):
+        self.boxes = {}
+
+    def insert(self, item_id, box):
+        self.boxes[item_id] = box
+
+    def remove(self, item_id):
+        self.boxes.pop(item_id, None)
+
+    def clear(self):
+        self.boxes.clear()
+
+    def candidates(self, box):
+        """Get ids of items that may touch the region"""
+        return set(self.boxes)
+
+
+class GridIndex:
+    """Uniform voxel-bucket grid mapping cells to the items covering them"""
+
+    def __init__(self, cell_size=10):
+        self.cell_size = cell_size
+        self.cells = {}  # (i, j, k) -> set of item ids
+        self.item_boxes = {}  # item id -> its box, from which its cells are recomputed
+
+    def _cell_keys(self, box):
+        size = self.cell_size
+        ranges = [
+            range(int(box[axis]) // size, int(box[axis + 3]) // size + 1)
+            for axis in range(3)
+        ]
+        return [(i, j, k) for i in ranges[0] for j in ranges[1] for k in ranges[2]]
+
+    def insert(self, item_id, box):
+        if item_id in self.item_boxes:
+            self.remove(item_id)
+        for key in self._cell_keys(box):
+            self.cells.setdefault(key, set()).add(item_id)
+        self.item_boxes[item_id] = box
+
+    def remove(self, item_id):
+        box = self.item_boxes.pop(item_id, None)
+        if box is None:
+            return
+        for key in self._cell_keys(box):
+            bucket = self.cells.get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self.cells[key]
+
+    def clear(self):
+        self.cells.clear()
+        self.item_boxes.clear()
+
+    def candidates(self, box):
+        """Get ids of items that may touch the region"""
+        keys = self._cell_keys(box)
+
+        # A region covering more cells than are occupied is cheaper to answer
+        # by walking the occupied cells instead
+        if len(keys) > len(self.cells):
+            size = self.cell_size
+            low = [int(box[axis]) // size for axis in range(3)]
+            high = [int(box[axis + 3]) // size for axis in range(3)]
+            found = set()
+            for key, bucket in self.cells.items():
+                if (low[0] <= key[0] <= high[0] and
+                    low[1] <= key[1] <= high[1] and
+                    low[2] <= key[2] <= high[2]):
+                    found |= bucket
+            return found
+
+        found = set()
+        for key in keys:
+            bucket = self.cells.get(key)
+            if bucket:
+                found |= bucket
+        return found
+
+
+# Index used by containers that do not ask for a specific one
+DEFAULT_INDEX = GridIndex
@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { getPlacementRecommendations } from '../services/api';
+import { startPlacementJob, waitForJob } from '../services/api';
 
 const PlacementView = () => {
   const [itemData, setItemData] = useState({
@@ -20,6 +20,7 @@ const PlacementView = () => {
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState('');
   const [messageType, setMessageType] = useState('');
+  const [progress, setProgress] = useState(null);
   
   const handleInputChange = (e) => {
     const { name, value } = e.target;
@@ -37,13 +38,42 @@ const PlacementView = () => {
     setMessage('');
     setRecommendations([]);
     setSelectedRecommendation(null);
+    setProgress(null);
     
     try {
-      const response = await getPlacementRecommendations(itemData);
+      // Placement runs as a background job and is polled, so large
+      // placements do not hit the request timeout
+      const job = await startPlacementJob({
+        items: [{
+          itemId: itemData.itemId,
+          name: itemData.name,
+          width: itemData.width,
+          depth: itemData.depth,
+          height: itemData.height,
+          mass: itemData.weight,
+          priority: itemData.priority,
+          expiryDate: itemData.expiryDate || null,
+          usageLimit: itemData.usesRemaining
+        }],
+        containers: []
+      });
+      if (!job.success) {
+        throw new Error(job.message || 'Could not start placement');
+      }
+      
+      const response = await waitForJob(job.jobId, setProgress);
       
       if (response.success) {
-        setRecommendations(response.recommendations || []);
-        if (response.recommendations.length === 0) {
+        const placements = (response.placements || []).map((placement) => ({
+          containerId: placement.containerId,
+          position: {
+            x: placement.position.startCoordinates.width,
+            y: placement.position.startCoordinates.depth,
+            z: placement.position.startCoordinates.height
+          }
+        }));
+        setRecommendations(placements);
+        if (placements.length === 0) {
           setMessage('No suitable placement locations found.');
           setMessageType('warning');
         } else {
@@ -59,6 +89,7 @@ const PlacementView = () => {
       setMessageType('error');
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   };
   
@@ -259,6 +290,9 @@ const PlacementView = () => {
           <button type="submit" className="cosmic-button" disabled={loading}>
             {loading ? 'Generating...' : 'Generate Recommendations'}
           </button>
+          {progress && (
+            <p>Processed {progress.processed} of {progress.total} items</p>
+          )}
         </form>
       </div>
       
@@ -276,7 +310,6 @@ const PlacementView = () => {
               >
                 <p>Container: {recommendation.containerId}</p>
                 <p>Position: ({recommendation.position.x}, {recommendation.position.y}, {recommendation.position.z})</p>
-                <p>Score: {recommendation.score}</p>
               </div>
             ))}
           </div>
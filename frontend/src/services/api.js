@@ -43,6 +43,75 @@ export const getPlacementRecommendations = async (data) => {
   }
 };
 
+export const getBatchPlacement = async (data) => {
+  try {
+    const response = await axios.post(`${API_URL}/placement/batch`, data);
+    return response.data;
+  } catch (error) {
+    return handleApiError(error);
+  }
+};
+
+// Placement jobs: large placements run in the background and are polled
+export const startPlacementJob = async (data, batch = false) => {
+  try {
+    const url = batch ? `${API_URL}/placement/batch` : `${API_URL}/placement`;
+    const response = await axios.post(url, { ...data, async: true });
+    return response.data;
+  } catch (error) {
+    return handleApiError(error);
+  }
+};
+
+// since: number of item results already fetched, so only new ones are returned
+export const getJobProgress = async (jobId, since = 0) => {
+  try {
+    const response = await axios.get(`${API_URL}/jobs/${jobId}`, { params: { since } });
+    return response.data;
+  } catch (error) {
+    return handleApiError(error);
+  }
+};
+
+export const cancelJob = async (jobId) => {
+  try {
+    const response = await axios.post(`${API_URL}/jobs/${jobId}/cancel`);
+    return response.data;
+  } catch (error) {
+    return handleApiError(error);
+  }
+};
+
+export const getJobResult = async (jobId) => {
+  try {
+    const response = await axios.get(`${API_URL}/jobs/${jobId}/result`);
+    return response.data;
+  } catch (error) {
+    return handleApiError(error);
+  }
+};
+
+// Poll a job until it finishes, calling onProgress with each update, then get its result
+export const waitForJob = async (jobId, onProgress, interval = 1000) => {
+  let since = 0;
+  for (;;) {
+    const progress = await getJobProgress(jobId, since);
+    if (!progress.success) {
+      // e.g. the job was pruned from the history
+      throw new Error(progress.message || 'Job not found');
+    }
+    const { job } = progress;
+    since = job.processed;
+    if (onProgress) {
+      onProgress(job);
+    }
+    if (['completed', 'cancelled', 'failed'].includes(job.status)) {
+      return getJobResult(jobId);
+    }
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+};
+
 // Search and Retrieval API
 export const searchItem = async (params) => {
   try {
@@ -110,15 +179,25 @@ export const simulateDay = async (data) => {
 };
 
 // Import/Export API
-export const importItems = async (file) => {
+// With asJob set the placement runs as a job and the response carries its jobId
+export const importItems = async (file, place = false, asJob = false) => {
   try {
     const formData = new FormData();
     formData.append('file', file);
     
+    const params = {};
+    if (place) {
+      params.place = true;
+      if (asJob) {
+        params.async = true;
+      }
+    }
+    
     const response = await axios.post(`${API_URL}/import/items`, formData, {
       headers: {
         'Content-Type': 'multipart/form-data'
-      }
+      },
+      params
     });
     return response.data;
   } catch (error) {
@@ -142,9 +221,11 @@ export const importContainers = async (file) => {
   }
 };
 
-export const exportArrangement = async () => {
+// params: { format: 'csv' | 'npy' | 'bin' | 'parquet' | 'arrow', containerId, zone }
+export const exportArrangement = async (params = {}) => {
   try {
     const response = await axios.get(`${API_URL}/export/arrangement`, {
+      params,
       responseType: 'blob'
     });
     
@@ -152,7 +233,8 @@ export const exportArrangement = async () => {
     const url = window.URL.createObjectURL(new Blob([response.data]));
     const link = document.createElement('a');
     link.href = url;
-    link.setAttribute('download', 'arrangement.csv');
+    const extension = params.format === 'arrow' ? 'arrows' : (params.format || 'csv');
+    link.setAttribute('download', `arrangement.${extension}`);
     document.body.appendChild(link);
     link.click();
     link.remove();